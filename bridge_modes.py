@@ -10,12 +10,21 @@
 
 from __future__ import annotations
 
+import logging
+import re
 from abc import ABC, abstractmethod
+from typing import Sequence
 
 from hw_detect import HardwareInfo, SwitchInfo
 from models import NetworkConfig
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
+
+# 用户端口写法: "lan1" / "lan2:t" / "eth1" / "2"
+_PORT_RE = re.compile(r"^(lan(\d+)|[^:]+)(:.*)?$")
+
 
 # ================================================================
 # 抽象基类
@@ -56,24 +65,27 @@ class DsaBridgeMode(BridgeMode):
     接口通过 `device` 字段绑定到 `br-lan.VID`。
     """
 
+    def __init__(self, hw: HardwareInfo) -> None:
+        # LAN 端口列表在整个运行期间不变，构造时固定一次
+        self._lan_ports = tuple(hw.lan_ports)
+
     @property
     def mode_name(self) -> str:
         return "DSA"
 
     def configure_base(self, uci: UciExecutor, hw: HardwareInfo) -> None:
-        print(f"\n>>> [Bridge/DSA] 创建 br-lan，端口: {hw.lan_ports}")
+        log.info("\n>>> [Bridge/DSA] 创建 br-lan，端口: %s", list(self._lan_ports))
         uci.set("network.lan_dev", "device")
         uci.set("network.lan_dev.name", "br-lan")
         uci.set("network.lan_dev.type", "bridge")
-        for port in hw.lan_ports:
-            uci.add_list("network.lan_dev.ports", port)
+        uci.extend_list("network.lan_dev.ports", self._lan_ports)
         uci.set("network.lan_dev.vlan_filtering", "1")
 
     def configure_vlan(
         self, uci: UciExecutor, net: NetworkConfig, hw: HardwareInfo
     ) -> None:
         vid = net.vlan_id
-        print(f"  [Bridge-VLAN/DSA] VLAN {vid}")
+        log.debug("  [Bridge-VLAN/DSA] VLAN %s", vid)
         uci.add("network", "bridge-vlan")
         uci.set("network.@bridge-vlan[-1].device", "br-lan")
         uci.set("network.@bridge-vlan[-1].vlan", str(vid))
@@ -82,22 +94,20 @@ class DsaBridgeMode(BridgeMode):
         # 1. 如果用户显式指定了端口
         if net.ports:
             # ports=['lan1', 'lan2:t'] -> valid ports
-            assignments = _resolve_ports(net.ports, hw.lan_ports)
+            assignments = _resolve_ports(net.ports, self._lan_ports)
             port_list = []
             for port, tagged in assignments:
                 # DSA 语法: 'eth1' (untagged/pvid), 'eth1:t' (tagged)
                 val = f"{port}:t" if tagged else port
                 port_list.append(val)
             
-            print(f"    Ports: {port_list}")
-            for p in port_list:
-                uci.add_list("network.@bridge-vlan[-1].ports", p)
+            log.debug("    Ports: %s", port_list)
+            uci.extend_list("network.@bridge-vlan[-1].ports", port_list)
         
         # 2. 默认行为 (未指定端口)
         elif vid == 1:
             # VLAN 1 (默认 LAN)：所有物理口作为 Untagged 成员
-            for port in hw.lan_ports:
-                uci.add_list("network.@bridge-vlan[-1].ports", port)
+            uci.extend_list("network.@bridge-vlan[-1].ports", self._lan_ports)
         # else: 其他 VLAN 默认不绑定物理口 (WiFi only)
 
     def configure_interface(
@@ -105,12 +115,15 @@ class DsaBridgeMode(BridgeMode):
     ) -> None:
         name = net.name
         device = f"br-lan.{net.vlan_id}"
-        print(f"  [Interface/DSA] {name} -> {device} ({net.subnet}/{net.netmask})")
-        uci.set(f"network.{name}", "interface")
-        uci.set(f"network.{name}.device", device)
-        uci.set(f"network.{name}.proto", "static")
-        uci.set(f"network.{name}.ipaddr", net.subnet)
-        uci.set(f"network.{name}.netmask", net.netmask)
+        log.debug("  [Interface/DSA] %s -> %s (%s/%s)",
+                  name, device, net.subnet, net.netmask)
+        section = f"network.{name}"
+        pfx = section + "."
+        uci.set(section, "interface")
+        uci.set(pfx + "device", device)
+        uci.set(pfx + "proto", "static")
+        uci.set(pfx + "ipaddr", net.subnet)
+        uci.set(pfx + "netmask", net.netmask)
 
 
 # ================================================================
@@ -126,6 +139,13 @@ class SwconfigBridgeMode(BridgeMode):
 
     def __init__(self, switch: SwitchInfo) -> None:
         self._switch = switch
+        # 端口字符串与 VLAN 无关，构造时计算一次
+        # CPU 端口始终为 Tagged
+        self._cpu_port_str = f"{switch.cpu_port}t"
+        # 默认 LAN VLAN：所有 LAN 口 Untagged + CPU Tagged
+        self._default_lan_ports_str = " ".join(
+            [*(str(p) for p in switch.lan_ports), self._cpu_port_str]
+        )
 
     @property
     def mode_name(self) -> str:
@@ -133,8 +153,8 @@ class SwconfigBridgeMode(BridgeMode):
 
     def configure_base(self, uci: UciExecutor, hw: HardwareInfo) -> None:
         sw = self._switch
-        print(f"\n>>> [Switch/Swconfig] 配置交换芯片: {sw.name}, "
-              f"CPU 端口: {sw.cpu_port}, LAN 端口: {sw.lan_ports}")
+        log.info("\n>>> [Switch/Swconfig] 配置交换芯片: %s, CPU 端口: %s, LAN 端口: %s",
+                 sw.name, sw.cpu_port, sw.lan_ports)
         uci.set(f"network.{sw.name}", "switch")
         uci.set(f"network.{sw.name}.name", sw.name)
         uci.set(f"network.{sw.name}.reset", "1")
@@ -143,7 +163,8 @@ class SwconfigBridgeMode(BridgeMode):
         # 保护 WAN 连接: 自动重建 VLAN 2
         # 前提: WAN 口存在且不等于 CPU 口
         if sw.wan_port is not None and sw.wan_port != sw.cpu_port:
-             print(f"    [WAN Preservation] 自动重建 VLAN 2 (WAN: {sw.wan_port}, CPU: {sw.cpu_port}t)")
+             log.info("    [WAN Preservation] 自动重建 VLAN 2 (WAN: %s, CPU: %st)",
+                      sw.wan_port, sw.cpu_port)
              uci.add("network", "switch_vlan")
              uci.set("network.@switch_vlan[-1].device", sw.name)
              uci.set("network.@switch_vlan[-1].vlan", "2")
@@ -155,10 +176,6 @@ class SwconfigBridgeMode(BridgeMode):
         sw = self._switch
         vid = net.vlan_id
 
-        # CPU 端口始终为 Tagged
-        cpu_port_str = f"{sw.cpu_port}t"
-        ports_str = ""
-
         # 1. 用户显式指定端口
         if net.ports:
             assignments = _resolve_ports(net.ports, sw.lan_ports)
@@ -169,19 +186,18 @@ class SwconfigBridgeMode(BridgeMode):
                 p_list.append(val)
             
             # 组合: 用户指定端口 + CPU
-            ports_str = " ".join(p_list) + f" {cpu_port_str}"
-            print(f"    Ports: {p_list} + CPU")
+            ports_str = " ".join([*p_list, self._cpu_port_str])
+            log.debug("    Ports: %s + CPU", p_list)
 
         # 2. 默认行为
         elif vid == 1:
             # 默认 LAN VLAN：所有 LAN 口 Untagged + CPU Tagged
-            lan_ports_str = " ".join(str(p) for p in sw.lan_ports)
-            ports_str = f"{lan_ports_str} {cpu_port_str}"
+            ports_str = self._default_lan_ports_str
         else:
             # 其他 VLAN：仅 CPU 端口
-            ports_str = cpu_port_str
+            ports_str = self._cpu_port_str
 
-        print(f"  [Switch-VLAN/Swconfig] VLAN {vid}, 端口: {ports_str}")
+        log.debug("  [Switch-VLAN/Swconfig] VLAN %s, 端口: %s", vid, ports_str)
         uci.add("network", "switch_vlan")
         uci.set("network.@switch_vlan[-1].device", sw.name)
         uci.set("network.@switch_vlan[-1].vlan", str(vid))
@@ -193,19 +209,22 @@ class SwconfigBridgeMode(BridgeMode):
         sw = self._switch
         name = net.name
         ifname = f"{sw.cpu_interface}.{net.vlan_id}"
-        print(f"  [Interface/Swconfig] {name} -> {ifname} ({net.subnet}/{net.netmask})")
-        uci.set(f"network.{name}", "interface")
-        uci.set(f"network.{name}.type", "bridge")
-        uci.set(f"network.{name}.ifname", ifname)
-        uci.set(f"network.{name}.proto", "static")
-        uci.set(f"network.{name}.ipaddr", net.subnet)
-        uci.set(f"network.{name}.netmask", net.netmask)
+        log.debug("  [Interface/Swconfig] %s -> %s (%s/%s)",
+                  name, ifname, net.subnet, net.netmask)
+        section = f"network.{name}"
+        pfx = section + "."
+        uci.set(section, "interface")
+        uci.set(pfx + "type", "bridge")
+        uci.set(pfx + "ifname", ifname)
+        uci.set(pfx + "proto", "static")
+        uci.set(pfx + "ipaddr", net.subnet)
+        uci.set(pfx + "netmask", net.netmask)
 
 
 # ================================================================
 # 辅助函数
 # ================================================================
-def _resolve_ports(user_ports: list[str], available_ports: list) -> list[tuple[any, bool]]:
+def _resolve_ports(user_ports: list[str], available_ports: Sequence) -> list[tuple[any, bool]]:
     """
     解析用户配置的端口列表。
     user_ports: ["lan1", "lan2:t", "eth1", "2"]
@@ -214,50 +233,47 @@ def _resolve_ports(user_ports: list[str], available_ports: list) -> list[tuple[a
     """
     result = []
     max_idx = len(available_ports)
-    
+    numeric = bool(available_ports) and isinstance(available_ports[0], int)
+
     # 建立端口值的快速查找表 (转为 string 用于匹配)
     avail_str_map = {str(p): p for p in available_ports}
+    match = _PORT_RE.match
 
     for p in user_ports:
         # p = "lan1:t" 或 "lan1" 或 "eth1" 或 "2"
-        clean_p = p.lower()
-        is_tagged = ":t" in clean_p
-        
-        # 提取基础部分: "lan1:t" -> "lan1"
-        base = clean_p.split(":")[0]
+        # group(1): 基础部分, group(2): lanX 的 X, group(3): ":t" 等后缀
+        m = match(p.lower())
+        if m is None:
+            log.warning("    ⚠️  配置警告: 无效端口格式 %s", p)
+            continue
+        base, lan_num, suffix = m.groups()
+        is_tagged = suffix == ":t"
 
         # 1. 尝试直接匹配物理端口值 (e.g. "eth1", "2")
         if base in avail_str_map:
             result.append((avail_str_map[base], is_tagged))
             continue
 
+        if lan_num is None:
+            log.warning("    ⚠️  配置警告: 未知端口 %s (非物理端口且非 lanX 格式)", p)
+            continue
+
         # 2. 解析 'lanX' 格式
-        if base.startswith("lan"):
-            try:
-                num_val = int(base.replace("lan", ""))
-                
-                # 情况 A: 端口是数字 (Swconfig) -> 优先按值匹配 (lan2 -> port 2)
-                # 只有当 available_ports 都是数字时才启用此逻辑
-                if available_ports and isinstance(available_ports[0], int):
-                    if num_val in available_ports:
-                        result.append((num_val, is_tagged))
-                        continue
-                    # 如果按值没找到，是否回退到 index? 
-                    # 比如 lan1 (port 2), 类似 DSA? 
-                    # 用户通常期望 lan2 = port 2. 如果 port 2 不存在, 可能是配置错误.
-                    # 但为了最大兼容性，如果不匹配值，我们可以尝试 index (下面逻辑)
-                
-                # 情况 B: 按索引匹配 (lan1 -> index 0)
-                # 适用于 DSA (lan1 -> eth1) 或 Swconfig 回退
-                idx = num_val - 1
-                if 0 <= idx < max_idx:
-                    result.append((available_ports[idx], is_tagged))
-                else:
-                    print(f"    ⚠️  配置警告: {p} 超出可用端口范围")
-            except ValueError:
-                print(f"    ⚠️  配置警告: 无效端口格式 {p}")
+        num_val = int(lan_num)
+
+        # 情况 A: 端口是数字 (Swconfig) -> 优先按值匹配 (lan2 -> port 2)
+        # 用户通常期望 lan2 = port 2，按值没找到时回退到下面的索引匹配
+        if numeric and num_val in available_ports:
+            result.append((num_val, is_tagged))
+            continue
+
+        # 情况 B: 按索引匹配 (lan1 -> index 0)
+        # 适用于 DSA (lan1 -> eth1) 或 Swconfig 回退
+        idx = num_val - 1
+        if 0 <= idx < max_idx:
+            result.append((available_ports[idx], is_tagged))
         else:
-             print(f"    ⚠️  配置警告: 未知端口 {p} (非物理端口且非 lanX 格式)")
+            log.warning("    ⚠️  配置警告: %s 超出可用端口范围", p)
 
     return result
 
@@ -267,17 +283,16 @@ def _resolve_ports(user_ports: list[str], available_ports: list) -> list[tuple[a
 # ================================================================
 def create_bridge_mode(hw: HardwareInfo) -> BridgeMode:
     """
-    根据探测结果创建对应的桥接模式策略。
+    根据硬件信息创建对应的桥接模式策略。
+    (模式及其来源由调用方记录日志)
 
     参数:
-        hw: 由 hw_detect.detect_hardware() 探测到的硬件信息
+        hw: 由 hw_detect.detect_hardware() 探测或配置文件指定的硬件信息
 
     返回:
         BridgeMode 实例
     """
     if hw.mode == "swconfig" and hw.switch is not None:
-        print(f">>> 桥接模式: Swconfig (自动探测)")
         return SwconfigBridgeMode(hw.switch)
     else:
-        print(f">>> 桥接模式: DSA (自动探测)")
-        return DsaBridgeMode()
+        return DsaBridgeMode(hw)
@@ -8,6 +8,7 @@
 
 from __future__ import annotations
 
+import logging
 import secrets
 import string
 from typing import Optional
@@ -16,6 +17,11 @@ from models import NetworkConfig, ProxyConfig, WifiInfo
 from roles import NetworkRole
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
+# WiFi 自动密码字符集 (字母 + 数字，共 62 个)
+_ALPHABET = string.ascii_letters + string.digits
+
 
 # ================================================================
 # DHCP 配置器
@@ -35,12 +41,14 @@ class DhcpConfigurator:
         role: NetworkRole,
     ) -> None:
         name = net.name
-        print(f"  [DHCP] {name} — 基础配置")
-        uci.set(f"dhcp.{name}", "dhcp")
-        uci.set(f"dhcp.{name}.interface", name)
-        uci.set(f"dhcp.{name}.start", "100")
-        uci.set(f"dhcp.{name}.limit", "150")
-        uci.set(f"dhcp.{name}.leasetime", "12h")
+        log.debug("  [DHCP] %s — 基础配置", name)
+        section = f"dhcp.{name}"
+        pfx = section + "."
+        uci.set(section, "dhcp")
+        uci.set(pfx + "interface", name)
+        uci.set(pfx + "start", "100")
+        uci.set(pfx + "limit", "150")
+        uci.set(pfx + "leasetime", "12h")
 
         # 委托角色策略处理差异化逻辑
         role.configure_dhcp(uci, net, proxy_cfg)
@@ -55,16 +63,22 @@ class WiFiConfigurator:
     DEFAULT_RADIO = "radio0"
     PASSWORD_LENGTH = 8
 
+    # 随机字节 → 密码字符的映射表 (b % 62)
+    # 248 = 62 * 4，丢弃 248~255 以避免取模偏差
+    _PASSWORD_CHARS = _ALPHABET.encode()
+    _PASSWORD_TABLE = (_PASSWORD_CHARS * 5)[:256]
+    _PASSWORD_REJECT = bytes(range(248, 256))
+
     def configure(
-        self, uci: UciExecutor, net: NetworkConfig, radio: str | None = None
+        self, uci: UciExecutor, net: NetworkConfig, radio: str | None = None,
+        wireless_available: bool = True,
     ) -> WifiInfo | None:
         if net.wifi is None:
             return None
 
-        # 检查 wireless 子系统是否可用（x86 Docker 等环境可能没有无线硬件）
-        # Export 模式下跳过检查，假设目标设备有无线能力
-        if not uci.is_export and not uci.is_dry_run and uci.query("show wireless") is None:
-            print(f"  [WiFi] ⚠️  无线子系统不可用，跳过 WiFi 配置: {net.wifi.ssid}")
+        # wireless 子系统是否可用由调用方统一探测一次（x86 Docker 等环境可能没有无线硬件）
+        if not wireless_available:
+            log.warning("  [WiFi] ⚠️  无线子系统不可用，跳过 WiFi 配置: %s", net.wifi.ssid)
             return None
 
         ssid = net.wifi.ssid
@@ -73,7 +87,7 @@ class WiFiConfigurator:
             password = self._generate_password()
 
         device = radio or self.DEFAULT_RADIO
-        print(f"  [WiFi] SSID: {ssid} @ {device}")
+        log.debug("  [WiFi] SSID: %s @ %s", ssid, device)
 
         uci.add("wireless", "wifi-iface")
         uci.set("wireless.@wifi-iface[-1].device", device)
@@ -85,10 +99,14 @@ class WiFiConfigurator:
 
         return WifiInfo(ssid=ssid, password=password, role=net.role, vlan_id=net.vlan_id)
 
-    @staticmethod
-    def _generate_password(length: int = 8) -> str:
-        chars = string.ascii_letters + string.digits
-        return "".join(secrets.choice(chars) for _ in range(length))
+    @classmethod
+    def _generate_password(cls, length: int = PASSWORD_LENGTH) -> str:
+        password = b""
+        while len(password) < length:
+            # 一次取一批随机字节，映射为字母数字
+            raw = secrets.token_bytes(length)
+            password += raw.translate(cls._PASSWORD_TABLE, cls._PASSWORD_REJECT)
+        return password[:length].decode()
 
 
 # ================================================================
@@ -104,18 +122,25 @@ class FirewallConfigurator:
 
     def configure(
         self, uci: UciExecutor, net: NetworkConfig, role: NetworkRole
-    ) -> None:
+    ) -> dict[str, str]:
+        """写入区域及到 WAN 的转发，返回区域的 {UCI 路径: 值}"""
         zone = net.name
-        print(f"  [Firewall] 区域: {zone} (角色: {net.role})")
+        log.debug("  [Firewall] 区域: %s (角色: %s)", zone, net.role)
 
         # 基础区域 — 安全基线: 默认拒绝转发
-        uci.set(f"firewall.{zone}", "zone")
-        uci.set(f"firewall.{zone}.name", zone)
-        uci.set(f"firewall.{zone}.network", net.name)
-        uci.set(f"firewall.{zone}.input", "ACCEPT")
-        uci.set(f"firewall.{zone}.output", "ACCEPT")
-        uci.set(f"firewall.{zone}.forward", "REJECT")
-        uci.set(f"firewall.{zone}.masq", "1")
+        section = f"firewall.{zone}"
+        pfx = section + "."
+        zone_cfg = {
+            section: "zone",
+            pfx + "name": zone,
+            pfx + "network": net.name,
+            pfx + "input": "ACCEPT",
+            pfx + "output": "ACCEPT",
+            pfx + "forward": "REJECT",
+            pfx + "masq": "1",
+        }
+        for path, value in zone_cfg.items():
+            uci.set(path, value)
 
         # 所有区域都需要访问 WAN
         uci.add("firewall", "forwarding")
@@ -124,3 +149,4 @@ class FirewallConfigurator:
 
         # 委托角色策略处理额外规则
         role.configure_firewall(uci, zone, net)
+        return zone_cfg
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 # Mock WifiConfig
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WifiConfig:
     ssid: str
     password: str
@@ -12,17 +12,21 @@
 
 from __future__ import annotations
 
+import logging
 import subprocess
+import weakref
 from dataclasses import dataclass, field
 from typing import Optional
 
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
 
 # ------------------------------------------------------------------
 # 探测结果数据模型
 # ------------------------------------------------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SwitchInfo:
     """Swconfig 模式下探测到的交换芯片参数"""
     name: str              # 交换芯片名 (如 "switch0")
@@ -32,7 +36,7 @@ class SwitchInfo:
     wan_port: int          # WAN 端口号
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HardwareInfo:
     """自动探测到的硬件信息"""
     mode: str              # "dsa" | "swconfig"
@@ -51,65 +55,147 @@ DSA_DEFAULTS = HardwareInfo(
 )
 
 
+# ------------------------------------------------------------------
+# 配置文件覆盖 (跳过运行时探测)
+# ------------------------------------------------------------------
+def parse_hardware(raw: dict) -> HardwareInfo:
+    """
+    由 YAML 中的 hardware 段构建 HardwareInfo，未填写的字段取 DSA 默认值。
+
+    配置示例:
+        hardware:
+            mode: "swconfig"
+            wan_interface: "eth0.2"
+            switch:
+                name: "switch0"
+                cpu_port: 6
+                cpu_interface: "eth0"
+                lan_ports: [1, 2, 3, 4]
+                wan_port: 0
+    """
+    mode = raw.get("mode", DSA_DEFAULTS.mode)
+    if mode not in ("dsa", "swconfig"):
+        # 拼写错误若静默回退 DSA，会在路由器上写入错误的桥接布局
+        raise ValueError(f"hardware.mode 无效: '{mode}'，可选值: dsa / swconfig")
+    switch = None
+    if mode == "swconfig":
+        s = raw.get("switch", {})
+        switch = SwitchInfo(
+            name=s.get("name", "switch0"),
+            cpu_port=int(s.get("cpu_port", 0)),
+            cpu_interface=s.get("cpu_interface", "eth0"),
+            lan_ports=sorted(int(p) for p in s.get("lan_ports", [1, 2, 3, 4])),
+            wan_port=int(s.get("wan_port", 5)),
+        )
+
+    return HardwareInfo(
+        mode=mode,
+        wan_interface=raw.get("wan_interface", DSA_DEFAULTS.wan_interface),
+        lan_ports=list(raw.get("lan_ports", [] if switch else DSA_DEFAULTS.lan_ports)),
+        switch=switch,
+    )
+
+
 # ------------------------------------------------------------------
 # 探测函数
 # ------------------------------------------------------------------
-def detect_hardware(uci: UciExecutor) -> HardwareInfo:
+# 每个 UciExecutor 的探测结果 (硬件在进程生命周期内不会变化)
+_HW_CACHE: weakref.WeakKeyDictionary[UciExecutor, HardwareInfo] = weakref.WeakKeyDictionary()
+
+
+def detect_hardware(uci: UciExecutor, force: bool = False) -> HardwareInfo:
     """
     自动探测 OpenWrt 硬件信息。
 
     export 模式下返回 DSA 默认值;
     运行时 (含 dry-run) 尝试通过 uci 命令探测实际配置，失败则回退默认值。
+    同一个 uci 执行器只探测一次，force=True 时强制重新探测。
     """
     if uci.is_export:
-        print(">>> [硬件探测] export 模式，使用默认值 (DSA)")
+        log.info(">>> [硬件探测] export 模式，使用默认值 (DSA)")
         return DSA_DEFAULTS
 
-    # 1. 优先探测 Swconfig (兼容旧设备/当前配置)
-    # 用户反馈：某些双支持设备配置为 switch 时，脚本误判为 DSA
-    is_swconfig = _detect_is_swconfig(uci)
-    if is_swconfig:
-        return _detect_swconfig(uci)
+    if force or uci not in _HW_CACHE:
+        _HW_CACHE[uci] = _detect(uci)
+    return _HW_CACHE[uci]
 
-    # 2. 探测 DSA
-    is_dsa = _detect_is_dsa_config(uci)
-    if is_dsa:
-        return _detect_dsa(uci)
 
-    # 3. 默认回退到 DSA (假定为现代设备或无配置)
-    print(">>> [硬件探测] 未检测到明确配置，默认使用 DSA 模式")
-    return _detect_dsa(uci)
+def _detect(uci: UciExecutor) -> HardwareInfo:
+    """执行实际探测"""
+    # 一次 `uci show network` 读取全部配置，以下探测均为内存查找
+    cfg = uci.dump("network")
 
+    mode = _classify_mode(cfg)
+    if mode == "swconfig":
+        return _detect_swconfig(uci, cfg)
+    if mode == "dsa":
+        return _detect_dsa(cfg)
 
-def _detect_is_swconfig(uci: UciExecutor) -> bool:
-    """检测是否为 swconfig 模式 (检查是否存在 switch section)"""
-    # 匹配 network.@switch[0]=switch 或 network.switch0=switch
-    result = uci.query("show network | grep '=switch'")
-    return bool(result)
+    # 默认回退到 DSA (假定为现代设备或无配置)
+    log.info(">>> [硬件探测] 未检测到明确配置，默认使用 DSA 模式")
+    return _detect_dsa(cfg)
 
 
-def _detect_is_dsa_config(uci: UciExecutor) -> bool:
-    """检测是否为 DSA 模式 (检查是否存在 bridge-vlan section)"""
-    result = uci.query("show network | grep '=bridge-vlan'")
-    return bool(result)
+def _group_sections(cfg: dict[str, str]) -> dict[str, dict[str, str]]:
+    """
+    将扁平的 {路径: 值} 按 section 分组 (保持 uci show 的顺序)。
+
+    network.wan=interface      -> {"network.wan": {".type": "interface", ...}}
+    network.wan.device='eth0'  -> {"network.wan": {"device": "eth0", ...}}
+    """
+    sections: dict[str, dict[str, str]] = {}
+    for key, val in cfg.items():
+        if key.count(".") == 1:
+            sections.setdefault(key, {})[".type"] = val
+        else:
+            section, _, option = key.rpartition(".")
+            sections.setdefault(section, {})[option] = val
+    return sections
+
+
+def _first_section(sections: dict[str, dict[str, str]], section_type: str) -> dict[str, str]:
+    """返回第一个指定类型的 section (匿名与具名均可)，不存在时返回空字典"""
+    for opts in sections.values():
+        if opts.get(".type") == section_type:
+            return opts
+    return {}
 
 
-def _detect_dsa(uci: UciExecutor) -> HardwareInfo:
+def _classify_mode(cfg: dict[str, str]) -> str:
+    """
+    一次遍历 section 类型判定桥接模式: "swconfig" | "dsa" | "unknown"。
+
+    优先判定 Swconfig (兼容旧设备/当前配置)：
+    用户反馈某些双支持设备配置为 switch 时，脚本误判为 DSA。
+    """
+    has_bridge_vlan = False
+    for key, val in cfg.items():
+        if key.count(".") != 1:
+            continue
+        # 匹配 network.@switch[0]=switch 或 network.switch0=switch
+        if val == "switch":
+            return "swconfig"
+        if val == "bridge-vlan":
+            has_bridge_vlan = True
+    return "dsa" if has_bridge_vlan else "unknown"
+
+
+def _detect_dsa(cfg: dict[str, str]) -> HardwareInfo:
     """DSA 模式下探测硬件"""
-    print(">>> [硬件探测] 检测到 DSA 模式")
+    log.info(">>> [硬件探测] 检测到 DSA 模式")
 
     # WAN 接口: 优先 device，回退 ifname
     wan = (
-        uci.query("get network.wan.device")
-        or uci.query("get network.wan.ifname")
+        cfg.get("network.wan.device")
+        or cfg.get("network.wan.ifname")
         or "eth0"
     )
-    print(f"    WAN 接口: {wan}")
+    log.info("    WAN 接口: %s", wan)
 
     # LAN 端口: 从 br-lan 的 ports 列表获取
-    lan_ports = _detect_dsa_lan_ports(uci)
+    lan_ports = _detect_dsa_lan_ports(cfg)
     lan_ports.sort()
-    print(f"    LAN 端口: {lan_ports}")
+    log.info("    LAN 端口: %s", lan_ports)
 
     return HardwareInfo(
         mode="dsa",
@@ -118,86 +204,79 @@ def _detect_dsa(uci: UciExecutor) -> HardwareInfo:
     )
 
 
-def _detect_dsa_lan_ports(uci: UciExecutor) -> list[str]:
+def _detect_dsa_lan_ports(cfg: dict[str, str]) -> list[str]:
     """探测 DSA 模式下的 LAN 端口"""
-    # 尝试从 br-lan device 配置获取端口列表
-    raw = uci.query("get network.@device[0].ports")
+    # 尝试从第一个 device section (通常为 br-lan) 获取端口列表
+    raw = _first_section(_group_sections(cfg), "device").get("ports")
     if raw:
         return raw.split()
 
     # 回退: 尝试匹配 lan_dev
-    raw = uci.query("get network.lan_dev.ports")
+    raw = cfg.get("network.lan_dev.ports")
     if raw:
         return raw.split()
 
     # 最终回退
-    print("    ⚠️  无法自动获取 LAN 端口，使用默认值")
+    log.warning("    ⚠️  无法自动获取 LAN 端口，使用默认值")
     return ["eth1", "eth2"]
 
 
-def _detect_swconfig(uci: UciExecutor) -> HardwareInfo:
+def _detect_swconfig(uci: UciExecutor, cfg: dict[str, str]) -> HardwareInfo:
     """Swconfig 模式下探测硬件"""
-    print(">>> [硬件探测] 检测到 Swconfig 模式")
+    log.info(">>> [硬件探测] 检测到 Swconfig 模式")
+
+    # 按 section 分组，匿名 (@switch[0]) 与具名 (switch0) section 均可匹配
+    sections = _group_sections(cfg)
 
     # 获取 switch 名称
-    switch_name = uci.query("get network.@switch[0].name") or "switch0"
+    switch_name = _first_section(sections, "switch").get("name") or "switch0"
 
     # WAN 接口
-    wan = uci.query("get network.wan.ifname") or "eth0"
+    wan = cfg.get("network.wan.ifname") or "eth0"
 
     # CPU 端口: 从 VLAN 1 的端口配置中提取带 't' 标记的端口
     cpu_port = 0
     cpu_interface = "eth0"
-    lan_ports: list[int] = []
+    lan_set: set[int] = set()
     wan_port = 5
 
     # 解析 switch_vlan 配置以确定 CPU/WAN/LAN
-    # 扫描所有 switch_vlan section 收集端口信息
-    all_vlan_ports = []
-    # 获取所有 vlan 配置的 ports 字段 (多行输出)
-    vlan_configs = uci.query("show network | grep 'switch_vlan.*ports='")
-    if vlan_configs:
-        for line in vlan_configs.splitlines():
-            # network.@switch_vlan[0].ports='1 5t' -> 提取 '1 5t'
-            if "=" in line:
-                val = line.split("=", 1)[1].strip("'")
-                all_vlan_ports.append(val)
-
-    # 分析端口角色
-    for ports_str in all_vlan_ports:
-        for token in ports_str.split():
-            if token.endswith("t"):
-                cpu_port = int(token[:-1])
-            else:
-                try:
-                    p = int(token)
-                    # 假定 VLAN 2 (通常是 WAN) 的非 tag 端口为 WAN 口
-                    if p not in lan_ports:
-                        lan_ports.append(p)
-                except ValueError:
-                    pass
+    # 遍历所有 switch_vlan: network.@switch_vlan[0].ports='1 5t' -> {"ports": "1 5t", ...}
+    switch_vlans = [
+        opts for opts in sections.values()
+        if opts.get(".type") == "switch_vlan"
+    ]
+
+    # 分析端口角色: 'Nt' 为 CPU 口 (tagged)，纯数字为成员口
+    for vlan in switch_vlans:
+        for token in vlan.get("ports", "").split():
+            if token[-1:] == "t":
+                if token[:-1].isdigit():
+                    cpu_port = int(token[:-1])
+            elif token.isdigit():
+                lan_set.add(int(token))
 
     # 尝试更精准的 WAN 口识别 (通常在 @switch_vlan[1] 或名为 wan 的 vlan 中)
     # 获取 vlan 2 的端口
-    vlan2_ports = uci.query("get network.@switch_vlan[1].ports")
+    vlan2_ports = switch_vlans[1].get("ports") if len(switch_vlans) > 1 else None
+    wan_set: set[int] = set()
     if vlan2_ports:
         for token in vlan2_ports.split():
-            if not token.endswith("t"):
-                try:
-                    wan_port = int(token)
-                    # 从 lan_ports 中移除 wan_port
-                    if wan_port in lan_ports:
-                        lan_ports.remove(wan_port)
-                except ValueError:
-                    pass
+            if token.isdigit():
+                wan_port = int(token)
+                wan_set.add(wan_port)
+
+    # LAN 口 = 所有成员口 - CPU 口 - WAN 口
+    lan_ports = sorted(lan_set - wan_set - {cpu_port, wan_port})
 
     # 尝试 CLI 探测硬件所有端口 (解决"只配置了1个口导致只探测到1个口"的问题)
     # 修复: 如果 UCI 已经配置了多个端口 (>=2)，则信任 UCI，不再使用 CLI 探测覆盖
     # 避免 CLI 探测出 ghost ports (物理不存在但 switch 芯片支持的端口)
-    if len(lan_ports) <= 1:
-        hw_ports = _detect_swconfig_ports_from_cli(uci, switch_name)
+    # Export 模式面向离线目标设备，本机探测无意义，直接跳过子进程
+    if len(lan_ports) <= 1 and not uci.is_export:
+        hw_ports = _detect_swconfig_ports_from_cli(switch_name)
         if hw_ports:
-            print(f"    [CLI] 硬件端口列表: {hw_ports}")
+            log.debug("    [CLI] 硬件端口列表: %s", hw_ports)
             # 如果 CLI 探测成功，使用 (Hardware - CPU - WAN) 作为 LAN 列表
             potential_lan = []
             for p in hw_ports:
@@ -207,18 +286,18 @@ def _detect_swconfig(uci: UciExecutor) -> HardwareInfo:
             if potential_lan:
                 lan_ports = potential_lan
     else:
-        print(f"    [UCI] 已配置 {len(lan_ports)} 个 LAN 端口，跳过 CLI 探测 (避免 ghost ports)")
+        log.debug("    [UCI] 已配置 %d 个 LAN 端口，跳过 CLI 探测 (避免 ghost ports)",
+                  len(lan_ports))
     
     # 默认值兜底
     if not lan_ports:
-        print("    ⚠️  未探测到 LAN 端口，使用默认值 [1, 2, 3, 4]")
+        log.warning("    ⚠️  未探测到 LAN 端口，使用默认值 [1, 2, 3, 4]")
         lan_ports = [1, 2, 3, 4]
 
     # CPU 接口: 通常跟 WAN 接口相关
-    cpu_interface = uci.query("get network.lan.ifname") or wan
+    cpu_interface = cfg.get("network.lan.ifname") or wan
     # 提取基础接口名 (去掉 .VID 后缀)
-    if "." in cpu_interface:
-        cpu_interface = cpu_interface.split(".")[0]
+    cpu_interface = cpu_interface.partition(".")[0]
 
     lan_ports.sort()
 
@@ -230,8 +309,8 @@ def _detect_swconfig(uci: UciExecutor) -> HardwareInfo:
         wan_port=wan_port,
     )
 
-    print(f"    Switch: {switch_name}, CPU: {cpu_port}, "
-          f"WAN: {wan_port}, LAN: {lan_ports}")
+    log.info("    Switch: %s, CPU: %s, WAN: %s, LAN: %s",
+             switch_name, cpu_port, wan_port, lan_ports)
 
     return HardwareInfo(
         mode="swconfig",
@@ -241,26 +320,23 @@ def _detect_swconfig(uci: UciExecutor) -> HardwareInfo:
     )
 
 
-def _detect_swconfig_ports_from_cli(uci: UciExecutor, switch_name: str) -> list[int]:
-    """尝试通过 swconfig 命令行列出所有端口"""
-    if uci.is_export:
-        return []
-
-    # swconfig 不是 uci 子命令，必须直接执行
+def _detect_swconfig_ports_from_cli(switch_name: str) -> list[int]:
+    """尝试通过 swconfig 命令行列出所有端口 (调用方负责判断是否需要探测)"""
+    # swconfig 不是 uci 子命令，必须直接执行；不经 shell/grep，在 Python 中过滤
     try:
         # Output example: Port 0: ...
         result = subprocess.run(
-            f"swconfig dev {switch_name} show | grep 'Port '",
-            shell=True,
+            ["swconfig", "dev", switch_name, "show"],
             capture_output=True,
-            text=True
+            text=True,
+            timeout=2,
         )
         if result.returncode != 0:
             return []
         output = result.stdout
-    except (FileNotFoundError, subprocess.CalledProcessError):
+    except (OSError, subprocess.SubprocessError):
         return []
-        
+
     ports = []
     for line in output.splitlines():
         if line.strip().startswith("Port "):
@@ -2,19 +2,20 @@
 数据模型层 — 纯数据类，无业务逻辑。
 将 YAML 配置映射为类型安全的 Python 对象。
 
-配置极简化：用户只需关注网络规划，硬件信息由运行时自动探测。
+配置极简化：用户只需关注网络规划，硬件信息由运行时自动探测
+(也可通过可选的 hardware 段手动指定，跳过探测)。
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import Optional
 
 
 # ------------------------------------------------------------------
 # WiFi 配置
 # ------------------------------------------------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WifiConfig:
     """单个 WiFi 接口的期望配置"""
     ssid: str
@@ -24,7 +25,7 @@ class WifiConfig:
 # ------------------------------------------------------------------
 # 网络（VLAN）配置
 # ------------------------------------------------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NetworkConfig:
     """单个 VLAN 网络的完整定义"""
     name: str
@@ -34,13 +35,13 @@ class NetworkConfig:
     netmask: str    # 如 "255.255.255.0"
     alias: str = ""
     wifi: Optional[WifiConfig] = None
-    ports: list[str] = field(default_factory=list)  # 可选: 物理端口绑定 (lan1, lan2:t)
+    ports: tuple[str, ...] = ()  # 可选: 物理端口绑定 (lan1, lan2:t)
 
 
 # ------------------------------------------------------------------
 # 全局/代理 配置
 # ------------------------------------------------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ProxyConfig:
     """代理网络相关的全局参数"""
     side_router_ip: str        # 旁路由 IP
@@ -50,7 +51,7 @@ class ProxyConfig:
 # ------------------------------------------------------------------
 # WiFi 信息（输出用）
 # ------------------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class WifiInfo:
     """运行结束后回显给用户的 WiFi 凭据"""
     ssid: str
@@ -75,6 +76,8 @@ def parse_config(raw: dict) -> tuple[Optional[ProxyConfig], list[NetworkConfig]]
             role: "proxy"
             wifi:
                 ssid: "Youtube"
+
+    返回 (proxy, networks)。可选的 hardware 段由 hw_detect.parse_hardware 解析。
     """
     # --- proxy 配置 (可选) ---
     proxy_cfg = None
@@ -102,7 +105,7 @@ def parse_config(raw: dict) -> tuple[Optional[ProxyConfig], list[NetworkConfig]]
         subnet = entry.get("subnet", f"192.168.{vlan_id}.1")
         netmask = entry.get("netmask", "255.255.255.0")
         alias = entry.get("alias", entry["name"])
-        ports = entry.get("ports", [])
+        ports = tuple(entry.get("ports", ()))
 
         wifi = None
         if "wifi" in entry:
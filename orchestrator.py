@@ -6,21 +6,23 @@
 
 from __future__ import annotations
 
+import logging
+from dataclasses import replace
 from pathlib import Path
 
-import yaml
-
 from bridge_modes import BridgeMode, create_bridge_mode
 from configurators import (
     DhcpConfigurator,
     FirewallConfigurator,
     WiFiConfigurator,
 )
-from hw_detect import HardwareInfo, detect_hardware
+from hw_detect import HardwareInfo, detect_hardware, parse_hardware
 from models import WifiInfo, parse_config
 from roles import RoleRegistry
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
 
 class NetworkOrchestrator:
     """
@@ -47,45 +49,58 @@ class NetworkOrchestrator:
     # ----------------------------------------------------------
     def run(self, config_path: str) -> None:
         """执行完整的网络配置流程"""
-        proxy_cfg, networks = self._load_config(config_path)
+        proxy_cfg, networks, hw_override = self._load_config(config_path)
         wifi_table: list[WifiInfo] = []
 
-        # 自动探测硬件
-        hw = detect_hardware(self._uci)
+        # 配置文件指定了硬件时直接使用，否则自动探测
+        hw = hw_override or detect_hardware(self._uci)
 
         # 创建桥接模式
         bridge_mode = create_bridge_mode(hw)
 
-        print("=" * 55)
-        print(">>> 开始根据 YAML 配置网络")
-        print(f"    桥接模式: {bridge_mode.mode_name} (自动探测)")
+        log.info("=" * 55)
+        log.info(">>> 开始根据 YAML 配置网络")
+        log.info("    桥接模式: %s (%s)", bridge_mode.mode_name,
+                 "配置指定" if hw_override else "自动探测")
         
         # 自动分配物理端口
-        self._auto_allocate_ports(networks, hw)
-
-        print(f"    可用角色: {self._registry.available_roles}")
-        print("=" * 55)
-
-        # 1. 配置桥接基础设施（网桥或交换芯片）
-        bridge_mode.configure_base(self._uci, hw)
-
-        # 2. 逐网络配置
-        for net in networks:
-            role = self._registry.get(net.role)
-            print(f"\n>>> 处理网络: {net.name} [{net.alias}] "
-                  f"(VLAN {net.vlan_id}, 角色: {net.role})")
-
-            bridge_mode.configure_vlan(self._uci, net, hw)
-            bridge_mode.configure_interface(self._uci, net)
-            self._dhcp.configure(self._uci, net, proxy_cfg, role)
-
-            wifi_info = self._wifi.configure(self._uci, net)
-            if wifi_info:
-                wifi_table.append(wifi_info)
-
-            self._firewall.configure(self._uci, net, role)
-
-        # 3. 提交所有更改
+        networks = self._auto_allocate_ports(networks, hw)
+
+        log.info("    可用角色: %s", self._registry.available_roles)
+        log.info("=" * 55)
+
+        # 检查 wireless 子系统是否可用（x86 Docker 等环境可能没有无线硬件）
+        # Export / Dry-run 模式下跳过检查，假设目标设备有无线能力
+        wireless_available = (
+            self._uci.is_export
+            or self._uci.is_dry_run
+            or self._uci.subsystem_exists("wireless")
+        )
+
+        # 所有写命令合并为一次 `uci batch` 执行；批处理成功后才提交
+        with self._uci.batch():
+            # 1. 配置桥接基础设施（网桥或交换芯片）
+            bridge_mode.configure_base(self._uci, hw)
+
+            # 2. 逐网络配置
+            for net in networks:
+                role = self._registry.get(net.role)
+                log.info("\n>>> 处理网络: %s [%s] (VLAN %s, 角色: %s)",
+                         net.name, net.alias, net.vlan_id, net.role)
+
+                bridge_mode.configure_vlan(self._uci, net, hw)
+                bridge_mode.configure_interface(self._uci, net)
+                self._dhcp.configure(self._uci, net, proxy_cfg, role)
+
+                wifi_info = self._wifi.configure(
+                    self._uci, net, wireless_available=wireless_available
+                )
+                if wifi_info:
+                    wifi_table.append(wifi_info)
+
+                self._firewall.configure(self._uci, net, role)
+
+        # 3. 提交所有更改 (写命令失败时 batch() 已抛出异常，不会走到这里)
         self._commit()
 
         # 4. 输出摘要
@@ -101,14 +116,23 @@ class NetworkOrchestrator:
         if not path.exists():
             raise FileNotFoundError(f"配置文件不存在: {path}")
 
-        with open(path, "r", encoding="utf-8") as f:
-            raw = yaml.safe_load(f)
+        # 延迟导入：--help 及参数错误路径无需承担 PyYAML 的导入开销
+        import yaml
 
-        return parse_config(raw)
+        # 优先使用 libyaml 的 C 加载器，未编译 libyaml 时回退纯 Python 实现
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        # 以字节流读取，由 libyaml 自行处理 BOM 与编码，省去一次文本解码
+        with open(path, "rb") as f:
+            raw = yaml.load(f, Loader=loader)
+
+        proxy_cfg, networks = parse_config(raw)
+        # 可选的 hardware 段：手动指定硬件，跳过自动探测
+        hw_override = parse_hardware(raw["hardware"]) if raw.get("hardware") else None
+        return proxy_cfg, networks, hw_override
 
     def _commit(self) -> None:
         """提交所有 UCI 子系统（跳过不存在的子系统）"""
-        print("\n>>> 正在提交 UCI 配置...")
+        log.info("\n>>> 正在提交 UCI 配置...")
         for subsystem in ("network", "dhcp", "firewall", "wireless"):
             # Export 模式下无法探测目标环境，默认全部生成
             if self._uci.is_export:
@@ -116,29 +140,35 @@ class NetworkOrchestrator:
                 continue
 
             # 运行时探测：某些环境可能缺少子系统（如 x86 Docker 无 wireless）
-            if not self._uci.is_dry_run and self._uci.query(f"show {subsystem}") is None:
-                print(f"  ⚠️  跳过 {subsystem}（子系统不存在）")
+            if not self._uci.is_dry_run and not self._uci.subsystem_exists(subsystem):
+                log.warning("  ⚠️  跳过 %s（子系统不存在）", subsystem)
                 continue
             self._uci.commit(subsystem)
 
     @staticmethod
     def _print_summary(wifi_table: list[WifiInfo]) -> None:
-        """打印 WiFi 凭据摘要表"""
+        """打印 WiFi 凭据摘要表 (最终结果，始终输出到 stdout，不受日志级别影响)"""
         print()
         print("=" * 65)
         print(" 配置完成！请重启网络服务或重启路由器。")
         print(" WiFi 信息如下（请截图保存）:")
         print("=" * 65)
-        print(f"  {'VLAN':<6} | {'SSID':<20} | {'Password':<15} | {'Role':<10}")
+        # 行格式只解析一次，表头与数据行共用
+        row = "  {:<6} | {:<20} | {:<15} | {:<10}".format
+        print(row("VLAN", "SSID", "Password", "Role"))
         print("  " + "-" * 60)
         for info in wifi_table:
-            print(f"  {info.vlan_id:<6} | {info.ssid:<20} | {info.password:<15} | {info.role:<10}")
+            print(row(info.vlan_id, info.ssid, info.password, info.role))
         print("=" * 65)
 
-    def _auto_allocate_ports(self, networks: list[NetworkConfig], hw: HardwareInfo) -> None:
+    def _auto_allocate_ports(
+        self, networks: list[NetworkConfig], hw: HardwareInfo
+    ) -> list[NetworkConfig]:
         """
         自动分配物理端口给各个网络 (简单策略: 1对1分配)。
         优先满足前面的网络，剩余端口归属 VLAN 1。
+
+        NetworkConfig 不可变，返回填充了 ports 的新列表。
         """
         # 获取可用 LAN 端口列表 (已由 hw_detect 排除 WAN 口)
         # Swconfig: [2, 3, 4] (ints)
@@ -148,62 +178,51 @@ class NetworkOrchestrator:
         if hw.mode == "swconfig" and hw.switch:
             lan_ports = hw.switch.lan_ports
         
-        # 复制一份用于分配
-        available_ports = list(lan_ports)
-        total_ports = len(available_ports)
+        total_ports = len(lan_ports)
 
         if total_ports == 0:
-            print(">>> [Auto Alloc] 无可用物理端口，跳过自动分配")
-            return
-
-        print(f">>> [Auto Alloc] 开始自动端口分配 (可用: {total_ports} 个, 端口: {available_ports})")
-
-        # 识别需要分配的网络 (未手动指定 ports 的)
-        targets = [net for net in networks if not net.ports]
-        
-        # 逐个分配
-        for net in targets:
-            if not available_ports:
-                print(f"    - {net.name}: 无可用端口 (WiFi only)")
-                continue
-            
-            # 分配一个端口
-            port_val = available_ports.pop(0)
-            
-            # 生成端口名
-            # Swconfig (int): 使用物理端口号 (lan2 -> port 2)
-            if isinstance(port_val, int):
-                port_name = f"lan{port_val}"
-            # DSA (str): 使用逻辑索引 (lan1 -> 第1个可用口)
-            else:
-                # 重新计算其原始索引 (从 lan_ports 中查找)
-                # 其实简单点，直接用 lanN (1-based index) 即可，
-                # 但为了与 debug 脚本一致，我们假设 DSA 下 lan1=eth1
-                try:
-                    idx = lan_ports.index(port_val) + 1
-                    port_name = f"lan{idx}" 
-                except ValueError:
-                    # 理论上不会发生
-                    port_name = f"lan{port_val}" 
-
-            net.ports.append(port_name) 
-            print(f"    - {net.name}: 分配 {port_name} (物理: {port_val})")
+            log.info(">>> [Auto Alloc] 无可用物理端口，跳过自动分配")
+            return list(networks)
+
+        log.info(">>> [Auto Alloc] 开始自动端口分配 (可用: %d 个, 端口: %s)",
+                 total_ports, list(lan_ports))
+
+        # 生成端口名
+        # Swconfig (int): 使用物理端口号 (lan2 -> port 2)
+        # DSA (str): 使用逻辑索引 (lan1 -> 第1个可用口)
+        port_names = [
+            f"lan{p}" if isinstance(p, int) else f"lan{i}"
+            for i, p in enumerate(lan_ports, 1)
+        ]
+
+        # 单次遍历: 识别需要分配的网络 (未手动指定 ports 的)、记录 VLAN 1 网络，
+        # 并按位置累积分配结果 (网络名可能重复)，最后统一重建 NetworkConfig
+        targets: list[int] = []
+        vlan1_idx: int | None = None
+        new_ports: list[list[str]] = []
+        for i, net in enumerate(networks):
+            new_ports.append(list(net.ports))
+            if not net.ports:
+                targets.append(i)
+            if net.vlan_id == 1 and vlan1_idx is None:
+                vlan1_idx = i
+        assigned = min(len(targets), total_ports)
+
+        # 1对1 分配，优先满足前面的网络
+        for i, port_name, port_val in zip(targets, port_names, lan_ports):
+            new_ports[i].append(port_name)
+            log.info("    - %s: 分配 %s (物理: %s)", networks[i].name, port_name, port_val)
+
+        for i in targets[assigned:]:
+            log.info("    - %s: 无可用端口 (WiFi only)", networks[i].name)
 
         # 剩余端口归属 VLAN 1 (lan)
-        if available_ports:
-            vlan1_net = next((n for n in networks if n.vlan_id == 1), None)
-            
-            # 生成剩余端口名列表
-            extras = []
-            for p in available_ports:
-                if isinstance(p, int):
-                    extras.append(f"lan{p}")
-                else:
-                    idx = lan_ports.index(p) + 1
-                    extras.append(f"lan{idx}")
-
-            if vlan1_net:
-                print(f"    - {vlan1_net.name} (VLAN 1): 追加剩余端口 {extras}")
-                vlan1_net.ports.extend(extras)
+        extras = port_names[assigned:]
+        if extras:
+            if vlan1_idx is not None:
+                log.info("    - %s (VLAN 1): 追加剩余端口 %s", networks[vlan1_idx].name, extras)
+                new_ports[vlan1_idx].extend(extras)
             else:
-                print(f"    - 剩余端口 {extras} 未使用 (未找到 VLAN 1)")
+                log.warning("    - 剩余端口 %s 未使用 (未找到 VLAN 1)", extras)
+
+        return [replace(net, ports=tuple(new_ports[i])) for i, net in enumerate(networks)]
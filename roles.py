@@ -11,12 +11,16 @@
 
 from __future__ import annotations
 
+import functools
+import logging
 from abc import ABC, abstractmethod
 from typing import Optional
 
 from models import ProxyConfig, NetworkConfig
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
 
 # ================================================================
 # 抽象基类
@@ -52,19 +56,19 @@ class ProxyRole(NetworkRole):
     ) -> None:
         name = net.name
         if proxy_cfg is None:
-            print(f"  [DHCP] Proxy 模式 — ⚠️ 未配置旁路由 IP，跳过网关指向")
+            log.warning("  [DHCP] Proxy 模式 — ⚠️ 未配置旁路由 IP，跳过网关指向")
             return
 
         if proxy_cfg.proxy_dhcp_mode == "main":
             # 主路由发 DHCP，但网关和 DNS 指向旁路由
             side_ip = proxy_cfg.side_router_ip
-            print(f"  [DHCP] Proxy 模式 — 网关/DNS 指向旁路由: {side_ip}")
+            log.debug("  [DHCP] Proxy 模式 — 网关/DNS 指向旁路由: %s", side_ip)
             uci.add_list(f"dhcp.{name}.dhcp_option", f"3,{side_ip}")  # Gateway
             uci.add_list(f"dhcp.{name}.dhcp_option", f"6,{side_ip}")  # DNS
             uci.set(f"dhcp.{name}.force", "1")
         else:
             # 旁路由接管 DHCP，主路由忽略
-            print(f"  [DHCP] Proxy 模式 — 由旁路由接管 (本机 ignore)")
+            log.debug("  [DHCP] Proxy 模式 — 由旁路由接管 (本机 ignore)")
             uci.set(f"dhcp.{name}.ignore", "1")
 
     def configure_firewall(
@@ -85,7 +89,7 @@ class CleanRole(NetworkRole):
         self, uci: UciExecutor, net: NetworkConfig,
         proxy_cfg: Optional[ProxyConfig],
     ) -> None:
-        print(f"  [DHCP] Clean 模式 — 直连, DNS: {self.PUBLIC_DNS}")
+        log.debug("  [DHCP] Clean 模式 — 直连, DNS: %s", self.PUBLIC_DNS)
         uci.add_list(f"dhcp.{net.name}.dhcp_option", f"6,{self.PUBLIC_DNS}")
 
     def configure_firewall(
@@ -105,7 +109,7 @@ class IsolateRole(NetworkRole):
         self, uci: UciExecutor, net: NetworkConfig,
         proxy_cfg: Optional[ProxyConfig],
     ) -> None:
-        print(f"  [DHCP] Isolate 模式 — 隔离, DNS: {self.PUBLIC_DNS}")
+        log.debug("  [DHCP] Isolate 模式 — 隔离, DNS: %s", self.PUBLIC_DNS)
         uci.add_list(f"dhcp.{net.name}.dhcp_option", f"6,{self.PUBLIC_DNS}")
 
     def configure_firewall(
@@ -129,32 +133,50 @@ class RoleRegistry:
 
     def __init__(self) -> None:
         self._roles: dict[str, NetworkRole] = {}
+        self._sorted_names: tuple[str, ...] = ()  # 注册时预先排序
+        self._available_str = ""                 # 错误提示用的角色列表
 
     def register(self, name: str, role: NetworkRole) -> None:
         """注册一个角色策略"""
         self._roles[name] = role
+        self._sorted_names = tuple(sorted(self._roles))
+        self._available_str = ", ".join(self._sorted_names)
 
     def get(self, name: str) -> NetworkRole:
         """根据名称获取角色策略，不存在则抛出明确异常"""
-        if name not in self._roles:
-            available = ", ".join(sorted(self._roles.keys()))
+        role = self._roles.get(name)
+        if role is None:
             raise ValueError(
-                f"未知的网络角色 '{name}'，可用角色: [{available}]"
+                f"未知的网络角色 '{name}'，可用角色: [{self._available_str}]"
             )
-        return self._roles[name]
+        return role
 
     @property
     def available_roles(self) -> list[str]:
-        return sorted(self._roles.keys())
+        return list(self._sorted_names)
+
+    def copy(self) -> RoleRegistry:
+        """浅拷贝 (角色实例共享)，用于在共享注册表基础上追加角色"""
+        clone = RoleRegistry()
+        clone._roles = dict(self._roles)
+        clone._sorted_names = self._sorted_names
+        clone._available_str = self._available_str
+        return clone
 
 
 # ================================================================
 # 默认注册表工厂
 # ================================================================
-def create_default_registry() -> RoleRegistry:
-    """创建包含所有内置角色的注册表"""
+@functools.cache
+def _default_registry() -> RoleRegistry:
+    """内置角色注册表的模板 (角色无状态，进程内只构建一次，不对外暴露)"""
     registry = RoleRegistry()
     registry.register("proxy", ProxyRole())
     registry.register("clean", CleanRole())
     registry.register("isolate", IsolateRole())
     return registry
+
+
+def create_default_registry() -> RoleRegistry:
+    """创建包含所有内置角色的注册表 (每次返回独立副本，可自由 register)"""
+    return _default_registry().copy()
@@ -6,17 +6,22 @@ OpenWrt 网络自动化 — CLI 入口。
     python3 setup_network.py                          # 正式执行 (自动探测硬件和模式)
     python3 setup_network.py --dry-run                # 仅打印命令，不执行
     python3 setup_network.py --config custom.yaml     # 指定配置文件
+    python3 setup_network.py --verbose                # 输出每一步的详细日志
+    python3 setup_network.py --quiet                  # 仅输出警告与最终摘要
 """
 
 from __future__ import annotations
 
 import argparse
+import logging
 import sys
 
 from orchestrator import NetworkOrchestrator
 from roles import create_default_registry
 from uci import UciExecutor
 
+log = logging.getLogger(__name__)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -37,29 +42,49 @@ def parse_args() -> argparse.Namespace:
         metavar="FILE",
         help="导出为 Shell 脚本文件 (例如: deploy.sh)，不直接执行",
     )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="输出每个网络的详细配置日志",
+    )
+    verbosity.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="仅输出警告和最终 WiFi 摘要 (适合 CI / 导出)",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
 
+    logging.basicConfig(
+        level=(
+            logging.DEBUG if args.verbose
+            else logging.WARNING if args.quiet
+            else logging.INFO
+        ),
+        format="%(message)s",
+        stream=sys.stdout,
+    )
+
     if args.dry_run:
-        print(">>> ⚠️  DRY-RUN 模式 — 所有 UCI 命令仅打印，不执行\n")
+        log.info(">>> ⚠️  DRY-RUN 模式 — 所有 UCI 命令仅打印，不执行\n")
     if args.export:
-        print(f">>> 📤 EXPORT 模式 — 生成部署脚本: {args.export}\n")
+        log.info(">>> 📤 EXPORT 模式 — 生成部署脚本: %s\n", args.export)
 
     # Export 模式隐含 dry-run (不执行命令)
     is_dry_run = args.dry_run or bool(args.export)
-    uci = UciExecutor(dry_run=is_dry_run, export=bool(args.export))
-
     registry = create_default_registry()
-    orchestrator = NetworkOrchestrator(uci, registry)
 
+    # with 块结束时关闭常驻查询进程
     try:
-        orchestrator.run(args.config)
-        
-        if args.export:
-            uci.write_script(args.export)
+        with UciExecutor(dry_run=is_dry_run, export=bool(args.export)) as uci:
+            NetworkOrchestrator(uci, registry).run(args.config)
+
+            if args.export:
+                uci.write_script(args.export)
 
     except FileNotFoundError as e:
         print(f"\n❌ 错误: {e}", file=sys.stderr)
@@ -0,0 +1,11 @@
+"""
+pytest 公共配置 — 让测试能 import 项目根目录下的模块。
+
+每个 xdist worker 只在加载 conftest 时执行一次。
+共享的测试工具见 tests/helpers.py。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+"""
+测试共享工具 — 记录命令的 UCI 执行器、断言辅助与公共硬件样例。
+
+普通模块而非 conftest：conftest 由 pytest 自行加载，
+在 importlib 导入模式下不能被测试文件直接 import。
+"""
+
+from collections import deque
+
+from hw_detect import HardwareInfo, SwitchInfo
+from uci import UciExecutor
+
+
+class RecordingUci(UciExecutor):
+    """记录所有 UCI 命令的执行器 (dry-run，不执行任何命令)"""
+
+    __slots__ = ("commands", "_text")
+
+    def __init__(self):
+        super().__init__(dry_run=True)
+        self.commands: deque[str] = deque()
+        self._text: str | None = None
+
+    def run(self, command: str) -> None:
+        self.commands.append(f"uci {command}")
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        """全部命令 (每行一条)，首次读取时拼接，记录新命令后失效"""
+        if self._text is None:
+            self._text = "\n".join(self.commands)
+        return self._text
+
+    def reset(self) -> None:
+        """清空记录，供同一测试类的多个用例复用"""
+        self.commands.clear()
+        self._text = None
+
+
+def assert_all_in(text: str, *needles: str) -> None:
+    """所有 needle 都应出现在命令记录中 (一次报告全部缺失项)"""
+    missing = [n for n in needles if n not in text]
+    assert not missing, f"缺少: {missing}"
+
+
+# 标准 3 口 Swconfig 硬件 (HardwareInfo/SwitchInfo 为 frozen，可跨用例共享)
+HW_SW_3 = HardwareInfo(
+    mode="swconfig",
+    wan_interface="eth0",
+    lan_ports=[],
+    switch=SwitchInfo(
+        name="switch0",
+        cpu_port=5,
+        cpu_interface="eth0",
+        lan_ports=[1, 2, 3],
+        wan_port=0,
+    ),
+)
@@ -3,18 +3,16 @@ hw_detect 模块测试 — 覆盖 DSA / Swconfig 各种场景。
 """
 
 import subprocess
-import sys
-import os
-import unittest
-from unittest.mock import patch, MagicMock
+from typing import NamedTuple
 
-# 让 import 能找到项目根目录
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
 
+import hw_detect
 from hw_detect import (
     HardwareInfo,
     SwitchInfo,
     detect_hardware,
+    parse_hardware,
     _detect_swconfig,
     _detect_dsa,
     _detect_swconfig_ports_from_cli,
@@ -32,242 +30,450 @@ class MockUci(UciExecutor):
         super().__init__()
         self._responses = responses or {}
 
-    def query(self, command: str) -> str | None:
-        # 精确匹配
-        if command in self._responses:
-            return self._responses[command]
-        # 模糊匹配 (grep 类)
-        for key, val in self._responses.items():
-            if key in command:
-                return val
-        return None
+    def _run_query(self, command: str) -> str | None:
+        # 只替换底层执行，保留 UciExecutor 的查询缓存
+        return self._responses.get(command)
+
+
+def _swconfig_show(vlan0_ports, vlan1_ports, switch_name, wan_ifname, lan_ifname) -> str:
+    return "\n".join([
+        "network.@switch[0]=switch",
+        f"network.@switch[0].name='{switch_name}'",
+        "network.@switch_vlan[0]=switch_vlan",
+        f"network.@switch_vlan[0].ports='{vlan0_ports}'",
+        "network.@switch_vlan[1]=switch_vlan",
+        f"network.@switch_vlan[1].ports='{vlan1_ports}'",
+        "network.wan=interface",
+        f"network.wan.ifname='{wan_ifname}'",
+        "network.lan=interface",
+        f"network.lan.ifname='{lan_ifname}'",
+    ])
+
+
+# 标准 Swconfig 参数与对应的响应表，模块级构建一次，所有测试共享 (MockUci 只读不写)
+_SWCONFIG_DEFAULTS = {
+    "vlan0_ports": "1 2 3 5t",
+    "vlan1_ports": "0 5t",
+    "switch_name": "switch0",
+    "wan_ifname": "eth0.2",
+    "lan_ifname": "eth0.1",
+}
+_BASE_RESPONSES = {"show network": _swconfig_show(**_SWCONFIG_DEFAULTS)}
+
+
+def _make_swconfig_uci(**overrides) -> MockUci:
+    if not overrides:
+        return MockUci(_BASE_RESPONSES)
+    show = _swconfig_show(**{**_SWCONFIG_DEFAULTS, **overrides})
+    return MockUci({**_BASE_RESPONSES, "show network": show})
+
+
+class FakeCli:
+    """替代 _detect_swconfig_ports_from_cli：返回预设端口并记录调用"""
+
+    def __init__(self):
+        self.ports: list[int] = []
+        self.calls: list[str] = []
+
+    def __call__(self, switch_name: str) -> list[int]:
+        self.calls.append(switch_name)
+        return list(self.ports)
+
+
+@pytest.fixture
+def fake_cli(monkeypatch):
+    """swconfig CLI 探测默认返回空 (不调用真实命令)"""
+    fake = FakeCli()
+    monkeypatch.setattr("hw_detect._detect_swconfig_ports_from_cli", fake)
+    return fake
+
+
+@pytest.fixture
+def default_swconfig_uci():
+    """标准 Swconfig 配置: LAN=1,2,3，WAN=0，CPU=5"""
+    return _make_swconfig_uci()
+
+
+def _make_dsa_uci(wan_device="eth0", lan_ports_str="eth1 eth2 eth3") -> MockUci:
+    # uci show 中列表值的格式: 'eth1' 'eth2' 'eth3'
+    ports = " ".join(f"'{p}'" for p in lan_ports_str.split())
+    return MockUci({
+        "show network": "\n".join([
+            "network.@device[0]=device",
+            f"network.@device[0].ports={ports}",
+            "network.@bridge-vlan[0]=bridge-vlan",
+            "network.wan=interface",
+            f"network.wan.device='{wan_device}'",
+        ]),
+    })
 
 
 # ================================================================
 # Swconfig 探测测试
 # ================================================================
-class TestSwconfigDetection(unittest.TestCase):
-    """Swconfig 模式下的硬件探测"""
-
-    def _make_uci(self, vlan0_ports="1 2 3 5t", vlan1_ports="0 5t",
-                  switch_name="switch0", wan_ifname="eth0.2",
-                  lan_ifname="eth0.1") -> MockUci:
-        return MockUci({
-            "show network | grep '=switch'": "network.switch0=switch",
-            "show network | grep '=bridge-vlan'": None,
-            "get network.@switch[0].name": switch_name,
-            "get network.wan.ifname": wan_ifname,
-            f"show network | grep 'switch_vlan.*ports='":
-                f"network.@switch_vlan[0].ports='{vlan0_ports}'\n"
-                f"network.@switch_vlan[1].ports='{vlan1_ports}'",
-            "get network.@switch_vlan[1].ports": vlan1_ports,
-            "get network.lan.ifname": lan_ifname,
-        })
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_basic_3_lan_ports(self, _mock_cli):
-        """3 个 LAN 口 (1,2,3)，WAN=0，CPU=5"""
-        uci = self._make_uci(vlan0_ports="1 2 3 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.mode, "swconfig")
-        self.assertIsNotNone(hw.switch)
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3])
-        self.assertEqual(hw.switch.wan_port, 0)
-        self.assertEqual(hw.switch.cpu_port, 5)
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_unsorted_lan_ports_get_sorted(self, _mock_cli):
-        """UCI 中端口顺序乱序 (3,1,2) → 输出应排序为 [1,2,3]"""
-        uci = self._make_uci(vlan0_ports="3 1 2 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3])
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_ghost_port_excluded_when_uci_has_multiple(self, _mock_cli):
-        """UCI 有 3 个端口 → 不调用 CLI → ghost port 不会混入"""
-        uci = self._make_uci(vlan0_ports="1 2 3 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        # CLI 不应被调用 (因 UCI 已有 >=2 个端口)
-        _mock_cli.assert_not_called()
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3])
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[0, 1, 2, 3, 4, 5])
-    def test_cli_fallback_when_only_one_lan_port(self, _mock_cli):
-        """UCI 只配了 1 个 LAN 口 → 回退到 CLI 探测"""
-        uci = self._make_uci(vlan0_ports="1 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        # CLI 应该被调用 (因 UCI 只有 1 个端口)
-        _mock_cli.assert_called_once()
-        # CLI 返回 [0..5], 排除 CPU=5 和 WAN=0 → [1,2,3,4]
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3, 4])
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[0, 1, 2, 3, 4, 5])
-    def test_cli_fallback_when_zero_lan_ports(self, _mock_cli):
-        """UCI 一个 LAN 口都没有 (极端情况) → 回退到 CLI"""
-        uci = self._make_uci(vlan0_ports="5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        _mock_cli.assert_called_once()
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3, 4])
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_wan_port_removed_from_lan(self, _mock_cli):
-        """WAN 口不应出现在 LAN 列表中"""
-        # 模拟 UCI 将 port 0 同时放在 VLAN 1 和 VLAN 2
-        uci = self._make_uci(vlan0_ports="0 1 2 3 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        self.assertNotIn(0, hw.switch.lan_ports)
-        self.assertEqual(hw.switch.wan_port, 0)
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3])
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_cpu_port_detection(self, _mock_cli):
-        """CPU 端口 (带 t 后缀) 应被正确解析"""
-        # CPU 在端口 0 的情况 (某些 AR71xx 路由器)
-        uci = self._make_uci(vlan0_ports="2 3 4 0t", vlan1_ports="1 0t")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.switch.cpu_port, 0)
-        self.assertEqual(hw.switch.wan_port, 1)
-        self.assertNotIn(0, hw.switch.lan_ports)
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_4_lan_ports(self, _mock_cli):
-        """标准 5 口路由器 (WAN=0, LAN=1,2,3,4, CPU=5)"""
-        uci = self._make_uci(vlan0_ports="1 2 3 4 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.switch.lan_ports, [1, 2, 3, 4])
-        self.assertEqual(hw.switch.wan_port, 0)
-
-    @patch("hw_detect._detect_swconfig_ports_from_cli", return_value=[])
-    def test_single_lan_port_default_fallback(self, _mock_cli):
-        """CLI 也没数据时，单 LAN 口应保留"""
-        uci = self._make_uci(vlan0_ports="1 5t", vlan1_ports="0 5t")
-        hw = detect_hardware(uci)
-
-        # CLI 返回空 → lan_ports 保持 UCI 的 [1]
-        self.assertEqual(hw.switch.lan_ports, [1])
+def test_swconfig_basic_3_lan_ports(fake_cli, default_swconfig_uci):
+    """3 个 LAN 口 (1,2,3)，WAN=0，CPU=5"""
+    uci = default_swconfig_uci
+    hw = detect_hardware(uci)
+
+    assert hw.mode == "swconfig"
+    assert hw.switch is not None
+    assert hw.switch.lan_ports == [1, 2, 3]
+    assert hw.switch.wan_port == 0
+    assert hw.switch.cpu_port == 5
+
+
+def test_swconfig_unsorted_lan_ports_get_sorted(fake_cli):
+    """UCI 中端口顺序乱序 (3,1,2) → 输出应排序为 [1,2,3]"""
+    uci = _make_swconfig_uci(vlan0_ports="3 1 2 5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    assert hw.switch.lan_ports == [1, 2, 3]
+
+
+def test_swconfig_ghost_port_excluded_when_uci_has_multiple(fake_cli, default_swconfig_uci):
+    """UCI 有 3 个端口 → 不调用 CLI → ghost port 不会混入"""
+    uci = default_swconfig_uci
+    hw = detect_hardware(uci)
+
+    # CLI 不应被调用 (因 UCI 已有 >=2 个端口)
+    assert fake_cli.calls == []
+    assert hw.switch.lan_ports == [1, 2, 3]
+
+
+def test_swconfig_cli_fallback_when_only_one_lan_port(fake_cli):
+    """UCI 只配了 1 个 LAN 口 → 回退到 CLI 探测"""
+    fake_cli.ports = [0, 1, 2, 3, 4, 5]
+    uci = _make_swconfig_uci(vlan0_ports="1 5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    # CLI 应该被调用 (因 UCI 只有 1 个端口)
+    assert fake_cli.calls == ["switch0"]
+    # CLI 返回 [0..5], 排除 CPU=5 和 WAN=0 → [1,2,3,4]
+    assert hw.switch.lan_ports == [1, 2, 3, 4]
+
+
+def test_swconfig_cli_fallback_when_zero_lan_ports(fake_cli):
+    """UCI 一个 LAN 口都没有 (极端情况) → 回退到 CLI"""
+    fake_cli.ports = [0, 1, 2, 3, 4, 5]
+    uci = _make_swconfig_uci(vlan0_ports="5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    assert fake_cli.calls == ["switch0"]
+    assert hw.switch.lan_ports == [1, 2, 3, 4]
+
+
+def test_swconfig_wan_port_removed_from_lan(fake_cli):
+    """WAN 口不应出现在 LAN 列表中"""
+    # 模拟 UCI 将 port 0 同时放在 VLAN 1 和 VLAN 2
+    uci = _make_swconfig_uci(vlan0_ports="0 1 2 3 5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    assert 0 not in hw.switch.lan_ports
+    assert hw.switch.wan_port == 0
+    assert hw.switch.lan_ports == [1, 2, 3]
+
+
+def test_swconfig_cpu_port_detection(fake_cli):
+    """CPU 端口 (带 t 后缀) 应被正确解析"""
+    # CPU 在端口 0 的情况 (某些 AR71xx 路由器)
+    uci = _make_swconfig_uci(vlan0_ports="2 3 4 0t", vlan1_ports="1 0t")
+    hw = detect_hardware(uci)
+
+    assert hw.switch.cpu_port == 0
+    assert hw.switch.wan_port == 1
+    assert 0 not in hw.switch.lan_ports
+
+
+def test_swconfig_4_lan_ports(fake_cli):
+    """标准 5 口路由器 (WAN=0, LAN=1,2,3,4, CPU=5)"""
+    uci = _make_swconfig_uci(vlan0_ports="1 2 3 4 5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    assert hw.switch.lan_ports == [1, 2, 3, 4]
+    assert hw.switch.wan_port == 0
+
+
+def test_swconfig_single_lan_port_default_fallback(fake_cli):
+    """CLI 也没数据时，单 LAN 口应保留"""
+    uci = _make_swconfig_uci(vlan0_ports="1 5t", vlan1_ports="0 5t")
+    hw = detect_hardware(uci)
+
+    # CLI 返回空 → lan_ports 保持 UCI 的 [1]
+    assert hw.switch.lan_ports == [1]
+
+
+def test_detection_reads_network_config_once(fake_cli, default_swconfig_uci, monkeypatch):
+    """整个探测过程只执行一次 uci show network"""
+    uci = default_swconfig_uci
+    queries = []
+    run_query = uci._run_query
+    monkeypatch.setattr(uci, "_run_query", lambda cmd: queries.append(cmd) or run_query(cmd))
+    detect_hardware(uci)
+    assert queries == ["show network"]
+
+
+def test_detection_memoized_per_executor(fake_cli, default_swconfig_uci, monkeypatch):
+    """同一执行器重复探测直接返回缓存，force=True 时重新探测"""
+    uci = default_swconfig_uci
+    hw = detect_hardware(uci)
+    detected = []
+    detect = hw_detect._detect
+    monkeypatch.setattr(hw_detect, "_detect", lambda u: detected.append(u) or detect(u))
+    assert detect_hardware(uci) is hw
+    assert detected == []
+    detect_hardware(uci, force=True)
+    assert detected == [uci]
+
+
+def test_swconfig_named_switch_vlan_sections(fake_cli):
+    """具名 switch / switch_vlan section (network.vlan1=switch_vlan) 同样被识别"""
+    uci = MockUci({
+        "show network": "\n".join([
+            "network.sw=switch",
+            "network.sw.name='switch1'",
+            "network.vlan1=switch_vlan",
+            "network.vlan1.ports='1 2 3 4 6t'",
+            "network.vlan2=switch_vlan",
+            "network.vlan2.ports='0 6t'",
+        ]),
+    })
+    hw = detect_hardware(uci)
+
+    assert hw.switch.name == "switch1"
+    assert hw.switch.cpu_port == 6
+    assert hw.switch.wan_port == 0
+    assert hw.switch.lan_ports == [1, 2, 3, 4]
 
 
 # ================================================================
 # DSA 探测测试
 # ================================================================
-class TestDsaDetection(unittest.TestCase):
-    """DSA 模式下的硬件探测"""
-
-    def _make_uci(self, wan_device="eth0", lan_ports_str="eth1 eth2 eth3") -> MockUci:
-        return MockUci({
-            "show network | grep '=switch'": None,
-            "show network | grep '=bridge-vlan'": "network.cfg0=bridge-vlan",
-            "get network.wan.device": wan_device,
-            "get network.wan.ifname": None,
-            "get network.@device[0].ports": lan_ports_str,
-        })
-
-    def test_basic_dsa_3_ports(self):
-        """DSA 基础: 3 个 LAN 口"""
-        uci = self._make_uci(lan_ports_str="eth1 eth2 eth3")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.mode, "dsa")
-        self.assertEqual(hw.lan_ports, ["eth1", "eth2", "eth3"])
-        self.assertEqual(hw.wan_interface, "eth0")
-
-    def test_dsa_ports_sorted(self):
-        """DSA 端口应排序 (eth3 eth1 eth2 → eth1 eth2 eth3)"""
-        uci = self._make_uci(lan_ports_str="eth3 eth1 eth2")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.lan_ports, ["eth1", "eth2", "eth3"])
-
-    def test_dsa_lan_named_ports(self):
-        """DSA 使用 lan1/lan2/lan3 命名的端口"""
-        uci = self._make_uci(lan_ports_str="lan1 lan2 lan3", wan_device="wan")
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.lan_ports, ["lan1", "lan2", "lan3"])
-        self.assertEqual(hw.wan_interface, "wan")
-
-    def test_dsa_fallback_ports(self):
-        """DSA 无法获取端口时使用默认值"""
-        uci = MockUci({
-            "show network | grep '=switch'": None,
-            "show network | grep '=bridge-vlan'": "network.cfg0=bridge-vlan",
-            "get network.wan.device": "eth0",
-            "get network.wan.ifname": None,
-            "get network.@device[0].ports": None,
-            "get network.lan_dev.ports": None,
-        })
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.lan_ports, ["eth1", "eth2"])
-
-    def test_dsa_no_switch_no_bridge_defaults_to_dsa(self):
-        """无 switch 也无 bridge-vlan 配置 → 默认 DSA"""
-        uci = MockUci({
-            "show network | grep '=switch'": None,
-            "show network | grep '=bridge-vlan'": None,
-            "get network.wan.device": "eth0",
-            "get network.wan.ifname": None,
-            "get network.@device[0].ports": "eth1 eth2",
-        })
-        hw = detect_hardware(uci)
-
-        self.assertEqual(hw.mode, "dsa")
+def test_dsa_basic_3_ports():
+    """DSA 基础: 3 个 LAN 口"""
+    uci = _make_dsa_uci(lan_ports_str="eth1 eth2 eth3")
+    hw = detect_hardware(uci)
+
+    assert hw.mode == "dsa"
+    assert hw.lan_ports == ["eth1", "eth2", "eth3"]
+    assert hw.wan_interface == "eth0"
+
+
+def test_dsa_ports_sorted():
+    """DSA 端口应排序 (eth3 eth1 eth2 → eth1 eth2 eth3)"""
+    uci = _make_dsa_uci(lan_ports_str="eth3 eth1 eth2")
+    hw = detect_hardware(uci)
+
+    assert hw.lan_ports == ["eth1", "eth2", "eth3"]
+
+
+def test_dsa_lan_named_ports():
+    """DSA 使用 lan1/lan2/lan3 命名的端口"""
+    uci = _make_dsa_uci(lan_ports_str="lan1 lan2 lan3", wan_device="wan")
+    hw = detect_hardware(uci)
+
+    assert hw.lan_ports == ["lan1", "lan2", "lan3"]
+    assert hw.wan_interface == "wan"
+
+
+def test_dsa_fallback_ports():
+    """DSA 无法获取端口时使用默认值"""
+    uci = MockUci({
+        "show network": "\n".join([
+            "network.@device[0]=device",
+            "network.@bridge-vlan[0]=bridge-vlan",
+            "network.wan=interface",
+            "network.wan.device='eth0'",
+        ]),
+    })
+    hw = detect_hardware(uci)
+
+    assert hw.lan_ports == ["eth1", "eth2"]
+
+
+def test_dsa_no_switch_no_bridge_defaults_to_dsa():
+    """无 switch 也无 bridge-vlan 配置 → 默认 DSA"""
+    uci = MockUci({
+        "show network": "\n".join([
+            "network.@device[0]=device",
+            "network.@device[0].ports='eth1' 'eth2'",
+            "network.lan=interface",
+            "network.wan=interface",
+            "network.wan.device='eth0'",
+        ]),
+    })
+    hw = detect_hardware(uci)
+
+    assert hw.mode == "dsa"
+    assert hw.lan_ports == ["eth1", "eth2"]
+
+
+def test_dsa_named_device_section():
+    """具名 device section (network.br_lan=device) 同样被识别"""
+    uci = MockUci({
+        "show network": "\n".join([
+            "network.loopback=interface",
+            "network.br_lan=device",
+            "network.br_lan.name='br-lan'",
+            "network.br_lan.ports='lan2' 'lan1'",
+            "network.@bridge-vlan[0]=bridge-vlan",
+            "network.wan=interface",
+            "network.wan.device='wan'",
+        ]),
+    })
+    hw = detect_hardware(uci)
+
+    assert hw.lan_ports == ["lan1", "lan2"]
+
+
+def test_dsa_lan_dev_ports_fallback():
+    """@device[0] 无端口时回退到 lan_dev"""
+    uci = MockUci({
+        "show network": "\n".join([
+            "network.@bridge-vlan[0]=bridge-vlan",
+            "network.lan_dev=device",
+            "network.lan_dev.ports='lan1' 'lan2'",
+            "network.wan=interface",
+            "network.wan.ifname='eth0'",
+        ]),
+    })
+    hw = detect_hardware(uci)
+
+    assert hw.lan_ports == ["lan1", "lan2"]
+    assert hw.wan_interface == "eth0"
 
 
 # ================================================================
 # Export 模式测试
 # ================================================================
-class TestExportMode(unittest.TestCase):
+def test_export_returns_dsa_defaults():
     """Export 模式下应使用默认值"""
+    uci = UciExecutor(export=True)
+    hw = detect_hardware(uci)
 
-    def test_export_returns_dsa_defaults(self):
-        uci = UciExecutor(export=True)
-        hw = detect_hardware(uci)
+    assert hw.mode == "dsa"
+    assert hw.wan_interface == "eth0"
+    assert hw.lan_ports == ["eth1", "eth2"]
 
-        self.assertEqual(hw.mode, "dsa")
-        self.assertEqual(hw.wan_interface, "eth0")
-        self.assertEqual(hw.lan_ports, ["eth1", "eth2"])
+
+# ================================================================
+# 模式判定测试
+# ================================================================
+def test_classify_switch_section_is_swconfig():
+    cfg = {"network.@bridge-vlan[0]": "bridge-vlan", "network.switch0": "switch"}
+    assert hw_detect._classify_mode(cfg) == "swconfig"
+
+
+def test_classify_bridge_vlan_section_is_dsa():
+    cfg = {"network.@bridge-vlan[0]": "bridge-vlan",
+           "network.@bridge-vlan[0].device": "switch"}
+    assert hw_detect._classify_mode(cfg) == "dsa"
+
+
+def test_classify_no_marker_is_unknown():
+    assert hw_detect._classify_mode({"network.wan": "interface"}) == "unknown"
+
+
+# ================================================================
+# hardware 配置段解析测试
+# ================================================================
+def test_parse_hardware_dsa():
+    """hardware 段指定 DSA 端口"""
+    hw = parse_hardware({"lan_ports": ["lan1", "lan2", "lan3"]})
+    assert hw.mode == "dsa"
+    assert hw.wan_interface == "eth0"
+    assert hw.lan_ports == ["lan1", "lan2", "lan3"]
+    assert hw.switch is None
+
+
+def test_parse_hardware_swconfig():
+    """hardware 段指定 swconfig 交换芯片参数"""
+    hw = parse_hardware({
+        "mode": "swconfig",
+        "wan_interface": "eth0.2",
+        "switch": {"cpu_port": 6, "lan_ports": [4, 3, 2, 1], "wan_port": 0},
+    })
+    assert hw.mode == "swconfig"
+    assert hw.lan_ports == []
+    assert hw.switch.name == "switch0"
+    assert hw.switch.cpu_port == 6
+    assert hw.switch.lan_ports == [1, 2, 3, 4]
+    assert hw.switch.wan_port == 0
+
+
+@pytest.mark.parametrize("mode", ["swconfg", "auto", "DSA"])
+def test_parse_hardware_invalid_mode_raises(mode):
+    """mode 拼写错误不应静默回退到 DSA"""
+    with pytest.raises(ValueError, match=mode):
+        parse_hardware({"mode": mode})
 
 
 # ================================================================
 # CLI 探测函数测试
 # ================================================================
-class TestSwconfigCliProbe(unittest.TestCase):
-    """swconfig CLI 调用的端口解析"""
-
-    @patch("subprocess.run")
-    def test_parse_port_output(self, mock_run):
-        """解析 swconfig show 的标准输出"""
-        mock_run.return_value = MagicMock(
-            returncode=0,
-            stdout="Port 0:\n  ...\nPort 1:\n  ...\nPort 2:\n  ...\nPort 3:\n  ...\nPort 4:\n  ...\nPort 5:\n  ...\n"
-        )
-        uci = UciExecutor()  # 非 export
-        ports = _detect_swconfig_ports_from_cli(uci, "switch0")
-        self.assertEqual(ports, [0, 1, 2, 3, 4, 5])
-
-    @patch("subprocess.run")
-    def test_cli_failure_returns_empty(self, mock_run):
-        """CLI 失败时返回空列表"""
-        mock_run.return_value = MagicMock(returncode=1, stdout="")
-        uci = UciExecutor()
-        ports = _detect_swconfig_ports_from_cli(uci, "switch0")
-        self.assertEqual(ports, [])
-
-    def test_export_mode_skips_cli(self):
-        """Export 模式下不调用 CLI"""
-        uci = UciExecutor(export=True)
-        ports = _detect_swconfig_ports_from_cli(uci, "switch0")
-        self.assertEqual(ports, [])
-
-
-if __name__ == "__main__":
-    unittest.main()
+class Result(NamedTuple):
+    returncode: int
+    stdout: str
+
+
+class FakeSubprocess:
+    """替代 subprocess.run：返回预设结果 (或抛出预设异常) 并记录调用参数"""
+
+    def __init__(self):
+        self.result = Result(0, "")
+        self.error: Exception | None = None
+        self.calls: list[tuple[tuple, dict]] = []
+
+    def run(self, *args, **kwargs) -> Result:
+        self.calls.append((args, kwargs))
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def fake_subprocess(monkeypatch):
+    fake = FakeSubprocess()
+    monkeypatch.setattr("hw_detect.subprocess.run", fake.run)
+    return fake
+
+
+def test_cli_parse_port_output(fake_subprocess):
+    """解析 swconfig show 的标准输出"""
+    fake_subprocess.result = Result(
+        0, "Port 0:\n  ...\nPort 1:\n  ...\nPort 2:\n  ...\nPort 3:\n  ...\nPort 4:\n  ...\nPort 5:\n  ...\n"
+    )
+    ports = _detect_swconfig_ports_from_cli("switch0")
+    assert ports == [0, 1, 2, 3, 4, 5]
+
+
+def test_cli_failure_returns_empty(fake_subprocess):
+    """CLI 失败时返回空列表"""
+    fake_subprocess.result = Result(1, "")
+    ports = _detect_swconfig_ports_from_cli("switch0")
+    assert ports == []
+
+
+def test_cli_invoked_without_shell(fake_subprocess):
+    """直接以 argv 调用 swconfig，不经 shell 管道，并设置超时"""
+    fake_subprocess.result = Result(0, "Port 0:\nPort 1:\n")
+    _detect_swconfig_ports_from_cli("switch0")
+    (args, kwargs), = fake_subprocess.calls
+    assert args[0] == ["swconfig", "dev", "switch0", "show"]
+    assert "shell" not in kwargs
+    assert "timeout" in kwargs
+
+
+def test_cli_timeout_returns_empty(fake_subprocess):
+    """swconfig 卡死超时时返回空列表"""
+    fake_subprocess.error = subprocess.TimeoutExpired("swconfig", 2)
+    assert _detect_swconfig_ports_from_cli("switch0") == []
+
+
+def test_export_mode_skips_cli(fake_subprocess):
+    """Export 模式下即使只有 1 个 LAN 口也不调用 CLI"""
+    cfg = {"network.@switch_vlan[0]": "switch_vlan",
+           "network.@switch_vlan[0].ports": "1 5t"}
+    hw = hw_detect._detect_swconfig(UciExecutor(export=True), cfg)
+    assert fake_subprocess.calls == []
+    assert hw.switch.lan_ports == [1]
@@ -2,157 +2,222 @@
 orchestrator.py 测试 — 自动端口分配逻辑。
 """
 
-import sys
 import os
+import subprocess
 import unittest
+from dataclasses import replace
+from unittest.mock import patch, MagicMock
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
 
+from bridge_modes import create_bridge_mode
 from orchestrator import NetworkOrchestrator
 from hw_detect import HardwareInfo, SwitchInfo
 from models import NetworkConfig, WifiConfig
 from roles import create_default_registry
 from uci import UciExecutor
+from tests.helpers import HW_SW_3
 
 
-class TestAutoAllocatePorts(unittest.TestCase):
-    """_auto_allocate_ports 端口分配逻辑"""
+# ================================================================
+# Fixtures
+# ================================================================
+# 角色注册表只读，模块导入时构建一次，所有用例共享
+_REGISTRY = create_default_registry()
 
-    def _make_orchestrator(self):
-        uci = UciExecutor(dry_run=True)
-        registry = create_default_registry()
-        return NetworkOrchestrator(uci, registry)
-
-    def _make_swconfig_hw(self, lan_ports):
-        sw = SwitchInfo(
-            name="switch0", cpu_port=5, cpu_interface="eth0",
-            lan_ports=lan_ports, wan_port=0,
-        )
-        return HardwareInfo(mode="swconfig", wan_interface="eth0",
-                            lan_ports=[], switch=sw)
-
-    def _make_dsa_hw(self, lan_ports):
-        return HardwareInfo(mode="dsa", wan_interface="eth0",
-                            lan_ports=lan_ports)
-
-    def _make_nets(self, count, with_ports=False):
-        """创建 count 个网络 (VLAN 1, 5, 3, ...)"""
-        vlan_ids = [1, 5, 3, 7, 9]
-        names = ["lan", "home", "iot", "guest", "test"]
-        roles = ["proxy", "clean", "isolate", "clean", "isolate"]
-        nets = []
-        for i in range(count):
-            nets.append(NetworkConfig(
-                name=names[i], vlan_id=vlan_ids[i], role=roles[i],
-                subnet=f"192.168.{vlan_ids[i]}.1", netmask="255.255.255.0",
-                ports=["lan1"] if with_ports else [],
-            ))
-        return nets
-
-    # ---- Swconfig 分配 ----
-
-    def test_swconfig_3_ports_3_nets(self):
-        """Swconfig: 3 口 3 网络 → 1对1, 无剩余"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([1, 2, 3])
-        nets = self._make_nets(3)
-
-        orc._auto_allocate_ports(nets, hw)
-
-        self.assertEqual(nets[0].ports, ["lan1"])  # lan → port 1
-        self.assertEqual(nets[1].ports, ["lan2"])  # home → port 2
-        self.assertEqual(nets[2].ports, ["lan3"])  # iot → port 3
-
-    def test_swconfig_4_ports_3_nets_remainder_to_vlan1(self):
-        """Swconfig: 4 口 3 网络 → 剩余 1 口归 VLAN 1"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([1, 2, 3, 4])
-        nets = self._make_nets(3)
-
-        orc._auto_allocate_ports(nets, hw)
-
-        # lan 分到 port 1, home 到 port 2, iot 到 port 3
-        # 剩余 port 4 归 VLAN 1 (lan)
-        self.assertEqual(nets[0].ports, ["lan1", "lan4"])
-        self.assertEqual(nets[1].ports, ["lan2"])
-        self.assertEqual(nets[2].ports, ["lan3"])
-
-    def test_swconfig_2_ports_3_nets_insufficient(self):
-        """Swconfig: 2 口 3 网络 → 第三个网络无端口 (WiFi only)"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([1, 2])
-        nets = self._make_nets(3)
-
-        orc._auto_allocate_ports(nets, hw)
-
-        self.assertEqual(nets[0].ports, ["lan1"])
-        self.assertEqual(nets[1].ports, ["lan2"])
-        self.assertEqual(nets[2].ports, [])  # WiFi only
-
-    def test_manual_ports_skip_allocation(self):
-        """手动指定 ports 的网络应跳过自动分配"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([1, 2, 3])
-        nets = self._make_nets(2, with_ports=True)  # 都有 ports=["lan1"]
-
-        orc._auto_allocate_ports(nets, hw)
-
-        # 网络都有 ports → 无 target → 不分配
-        # 但剩余端口仍归 VLAN 1 (nets[0])
-        self.assertEqual(nets[0].ports, ["lan1", "lan1", "lan2", "lan3"])
-
-    def test_zero_ports_skips(self):
-        """0 口 → 跳过分配"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([])
-        nets = self._make_nets(2)
-
-        orc._auto_allocate_ports(nets, hw)
-
-        self.assertEqual(nets[0].ports, [])
-        self.assertEqual(nets[1].ports, [])
-
-    # ---- DSA 分配 ----
-
-    def test_dsa_3_ports_3_nets(self):
-        """DSA: 3 口 3 网络"""
-        orc = self._make_orchestrator()
-        hw = self._make_dsa_hw(["eth1", "eth2", "eth3"])
-        nets = self._make_nets(3)
-
-        orc._auto_allocate_ports(nets, hw)
-
-        self.assertEqual(nets[0].ports, ["lan1"])
-        self.assertEqual(nets[1].ports, ["lan2"])
-        self.assertEqual(nets[2].ports, ["lan3"])
-
-    def test_dsa_4_ports_2_nets_remainder_to_vlan1(self):
-        """DSA: 4 口 2 网络 → 剩余归 VLAN 1"""
-        orc = self._make_orchestrator()
-        hw = self._make_dsa_hw(["eth1", "eth2", "eth3", "eth4"])
-        nets = self._make_nets(2)
 
-        orc._auto_allocate_ports(nets, hw)
+@pytest.fixture
+def orchestrator():
+    return NetworkOrchestrator(UciExecutor(dry_run=True), _REGISTRY)
+
+
+def _make_swconfig_hw(lan_ports):
+    if lan_ports == HW_SW_3.switch.lan_ports:
+        return HW_SW_3
+    sw = SwitchInfo(
+        name="switch0", cpu_port=5, cpu_interface="eth0",
+        lan_ports=lan_ports, wan_port=0,
+    )
+    return HardwareInfo(mode="swconfig", wan_interface="eth0",
+                        lan_ports=[], switch=sw)
+
 
-        # lan → eth1 (lan1), home → eth2 (lan2)
-        # 剩余 eth3 (lan3), eth4 (lan4) 归 VLAN 1 (lan)
-        self.assertEqual(nets[0].ports, ["lan1", "lan3", "lan4"])
-        self.assertEqual(nets[1].ports, ["lan2"])
+def _make_dsa_hw(lan_ports):
+    return HardwareInfo(mode="dsa", wan_interface="eth0",
+                        lan_ports=lan_ports)
 
-    def test_single_net_gets_all_ports(self):
-        """单网络 → 分到 1 个端口 + 剩余全归 VLAN 1"""
-        orc = self._make_orchestrator()
-        hw = self._make_swconfig_hw([1, 2, 3, 4])
-        nets = self._make_nets(1)
 
-        orc._auto_allocate_ports(nets, hw)
+# (name, vlan_id, role) 模板: VLAN 1, 5, 3, ...
+_NET_TEMPLATE = (
+    ("lan", 1, "proxy"),
+    ("home", 5, "clean"),
+    ("iot", 3, "isolate"),
+    ("guest", 7, "clean"),
+    ("test", 9, "isolate"),
+)
 
-        self.assertEqual(nets[0].ports, ["lan1", "lan2", "lan3", "lan4"])
+
+def _make_nets(count, with_ports=False):
+    """按模板创建前 count 个网络"""
+    ports = ("lan1",) if with_ports else ()
+    return [
+        NetworkConfig(name=n, vlan_id=v, role=r,
+                      subnet=f"192.168.{v}.1", netmask="255.255.255.0",
+                      ports=ports)
+        for n, v, r in _NET_TEMPLATE[:count]
+    ]
+
+
+# ================================================================
+# _auto_allocate_ports 端口分配逻辑
+# ================================================================
+@pytest.mark.parametrize("hw,net_count,with_ports,expected", [
+    # Swconfig: 3 口 3 网络 → 1对1, 无剩余 (lan → port 1, home → 2, iot → 3)
+    (_make_swconfig_hw([1, 2, 3]), 3, False,
+     [("lan1",), ("lan2",), ("lan3",)]),
+    # Swconfig: 4 口 3 网络 → 剩余 port 4 归 VLAN 1 (lan)
+    (_make_swconfig_hw([1, 2, 3, 4]), 3, False,
+     [("lan1", "lan4"), ("lan2",), ("lan3",)]),
+    # Swconfig: 2 口 3 网络 → 第三个网络无端口 (WiFi only)
+    (_make_swconfig_hw([1, 2]), 3, False,
+     [("lan1",), ("lan2",), ()]),
+    # 手动指定 ports 的网络跳过自动分配，但剩余端口仍归 VLAN 1
+    (_make_swconfig_hw([1, 2, 3]), 2, True,
+     [("lan1", "lan1", "lan2", "lan3"), ("lan1",)]),
+    # 0 口 → 跳过分配
+    (_make_swconfig_hw([]), 2, False,
+     [(), ()]),
+    # 单网络 → 分到 1 个端口 + 剩余全归 VLAN 1
+    (_make_swconfig_hw([1, 2, 3, 4]), 1, False,
+     [("lan1", "lan2", "lan3", "lan4")]),
+    # DSA: 3 口 3 网络
+    (_make_dsa_hw(["eth1", "eth2", "eth3"]), 3, False,
+     [("lan1",), ("lan2",), ("lan3",)]),
+    # DSA: 4 口 2 网络 → 剩余 eth3 (lan3), eth4 (lan4) 归 VLAN 1
+    (_make_dsa_hw(["eth1", "eth2", "eth3", "eth4"]), 2, False,
+     [("lan1", "lan3", "lan4"), ("lan2",)]),
+], ids=[
+    "swconfig-3p-3n", "swconfig-4p-3n-remainder", "swconfig-2p-3n-insufficient",
+    "manual-ports", "zero-ports", "single-net-all-ports",
+    "dsa-3p-3n", "dsa-4p-2n-remainder",
+])
+def test_auto_allocate_ports(orchestrator, hw, net_count, with_ports, expected):
+    nets = orchestrator._auto_allocate_ports(_make_nets(net_count, with_ports), hw)
+    assert [n.ports for n in nets] == expected
+
+
+def test_input_networks_not_mutated(orchestrator):
+    """分配结果以新对象返回，原 NetworkConfig 保持不变"""
+    hw = _make_dsa_hw(["eth1", "eth2"])
+    nets = _make_nets(2)
+
+    allocated = orchestrator._auto_allocate_ports(nets, hw)
+
+    assert [n.ports for n in nets] == [(), ()]
+    assert [n.ports for n in allocated] == [("lan1",), ("lan2",)]
+    assert len({*allocated}) == 2  # 不可变 → 可哈希
+
+
+def test_duplicate_names_allocated_separately(orchestrator):
+    """同名网络按位置分别分配，不会合并端口"""
+    hw = _make_dsa_hw(["eth1", "eth2"])
+    nets = [replace(n, name="lan") for n in _make_nets(2)]
+
+    allocated = orchestrator._auto_allocate_ports(nets, hw)
+
+    assert [n.ports for n in allocated] == [("lan1",), ("lan2",)]
+
+
+# ================================================================
+# run() 写入与提交
+# ================================================================
+_PLAN_YAML = """\
+networks:
+  - name: "lan"
+    vlan_id: 1
+    role: "proxy"
+"""
+
+
+def _batch_proc(stderr=""):
+    """模拟 `uci batch` 进程：communicate() 返回 (stdout, stderr)"""
+    proc = MagicMock(returncode=0)
+    proc.communicate.return_value = (None, stderr)
+    return proc
+
+
+def test_batch_error_skips_commit(tmp_path, monkeypatch):
+    """uci batch 报错 (即使退出码为 0) 时不应提交任何子系统"""
+    path = tmp_path / "plan.yaml"
+    path.write_text(_PLAN_YAML)
+    monkeypatch.setattr("orchestrator.detect_hardware",
+                        lambda uci: _make_dsa_hw(["lan1"]))
+    monkeypatch.setattr(UciExecutor, "_run_query", lambda self, command: None)
+
+    with patch("uci.subprocess.Popen",
+               return_value=_batch_proc("uci: Invalid argument\n")) as mock_popen, \
+         patch("uci.subprocess.run") as mock_run:
+        orch = NetworkOrchestrator(UciExecutor(), create_default_registry())
+        with pytest.raises(subprocess.CalledProcessError):
+            orch.run(str(path))
+
+    mock_popen.assert_called_once()
+    stdin = mock_popen.return_value.communicate.call_args.args[0]
+    assert "commit" not in stdin
+    mock_run.assert_not_called()
+
+
+_PINNED_HW_YAML = """\
+hardware:
+  mode: "swconfig"
+  wan_interface: "eth0.2"
+  switch:
+    name: "switch1"
+    cpu_port: 6
+    cpu_interface: "eth0"
+    lan_ports: [1, 2]
+    wan_port: 0
+""" + _PLAN_YAML
+
+
+def test_hardware_section_skips_detection(tmp_path, monkeypatch):
+    """YAML 指定 hardware 段时直接使用，不调用自动探测"""
+    path = tmp_path / "plan.yaml"
+    path.write_text(_PINNED_HW_YAML)
+
+    def _fail(uci):
+        raise AssertionError("不应调用 detect_hardware")
+
+    used = []
+    monkeypatch.setattr("orchestrator.detect_hardware", _fail)
+    monkeypatch.setattr("orchestrator.create_bridge_mode",
+                        lambda hw: used.append(hw) or create_bridge_mode(hw))
+
+    NetworkOrchestrator(UciExecutor(dry_run=True), _REGISTRY).run(str(path))
+
+    assert used == [HardwareInfo(
+        mode="swconfig", wan_interface="eth0.2", lan_ports=[],
+        switch=SwitchInfo(name="switch1", cpu_port=6, cpu_interface="eth0",
+                          lan_ports=[1, 2], wan_port=0),
+    )]
 
 
 # ================================================================
 # UciExecutor 模式测试
 # ================================================================
+def test_export_write_script(tmp_path):
+    """Export 模式写脚本"""
+    uci = UciExecutor(export=True)
+    uci.set("network.lan", "interface")
+
+    path = tmp_path / "out.sh"
+    uci.write_script(str(path))
+
+    content = path.read_text()
+    assert "#!/bin/sh" in content
+    assert "uci set" in content
+
+
 class TestUciExecutor(unittest.TestCase):
 
     def test_dry_run_mode(self):
@@ -172,23 +237,21 @@ class TestUciExecutor(unittest.TestCase):
         # query 应返回 None
         self.assertIsNone(uci.query("get network.lan"))
 
-    def test_export_write_script(self):
-        """Export 模式写脚本"""
-        import tempfile
+    def test_semantic_api_formats_commands(self):
+        """语义化 API 拼接出的命令文本"""
         uci = UciExecutor(export=True)
         uci.set("network.lan", "interface")
-
-        with tempfile.NamedTemporaryFile(suffix=".sh", delete=False, mode="w") as f:
-            path = f.name
-
-        uci.write_script(path)
-
-        with open(path, "r") as f:
-            content = f.read()
-
-        self.assertIn("#!/bin/sh", content)
-        self.assertIn("uci set", content)
-        os.unlink(path)
+        uci.add("network", "switch_vlan")
+        uci.add_list("network.lan.dns", "1.1.1.1")
+        uci.delete("network.wan6")
+        uci.commit("network")
+        self.assertEqual(uci._commands, [
+            "uci set network.lan='interface'",
+            "uci add network switch_vlan",
+            "uci add_list network.lan.dns='1.1.1.1'",
+            "uci delete network.wan6",
+            "uci commit network",
+        ])
 
     def test_non_export_cannot_write_script(self):
         """非 export 模式调用 write_script 应报错"""
@@ -196,6 +259,154 @@ class TestUciExecutor(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             uci.write_script("/tmp/test.sh")
 
+    @patch("uci.subprocess.run")
+    @patch("uci.subprocess.Popen")
+    def test_batch_pipes_all_commands_once(self, mock_popen, mock_run):
+        """batch() 内的写命令应通过一次 uci batch 执行"""
+        mock_popen.return_value = _batch_proc()
+        uci = UciExecutor()
+        with uci.batch():
+            uci.set("network.lan", "interface")
+            uci.add_list("network.lan_dev.ports", "eth1")
+            uci.commit("network")
+
+        mock_run.assert_not_called()
+        mock_popen.assert_called_once()
+        self.assertEqual(mock_popen.call_args.args[0], ["uci", "batch"])
+        stdin = mock_popen.return_value.communicate.call_args.args[0]
+        self.assertEqual(stdin.splitlines(), [
+            "set network.lan='interface'",
+            "add_list network.lan_dev.ports='eth1'",
+            "commit network",
+        ])
+
+    @patch("uci.subprocess.run")
+    @patch("uci.subprocess.Popen")
+    def test_extend_list_single_batch(self, mock_popen, mock_run):
+        """extend_list 在 batch 外也只启动一次 uci batch"""
+        mock_popen.return_value = _batch_proc()
+        uci = UciExecutor()
+        uci.extend_list("network.lan_dev.ports", ["eth1", "eth2"])
+
+        mock_run.assert_not_called()
+        mock_popen.assert_called_once()
+        stdin = mock_popen.return_value.communicate.call_args.args[0]
+        self.assertEqual(stdin.splitlines(), [
+            "add_list network.lan_dev.ports='eth1'",
+            "add_list network.lan_dev.ports='eth2'",
+        ])
+
+    @patch("uci.subprocess.Popen")
+    def test_batch_discarded_on_error(self, mock_popen):
+        """batch() 内抛出异常时不应执行任何命令"""
+        uci = UciExecutor()
+        with self.assertRaises(ValueError):
+            with uci.batch():
+                uci.set("network.lan", "interface")
+                raise ValueError("boom")
+        mock_popen.assert_not_called()
+
+    @patch("uci.subprocess.Popen")
+    def test_batch_stderr_raises(self, mock_popen):
+        """uci batch 退出码为 0 但 stderr 有输出时视为失败"""
+        mock_popen.return_value = _batch_proc("uci: Parse error\n")
+        uci = UciExecutor()
+        with self.assertRaises(subprocess.CalledProcessError):
+            with uci.batch():
+                uci.set("network.lan", "interface")
+        self.assertEqual(mock_popen.call_args.kwargs["stderr"], subprocess.PIPE)
+
+    @patch("uci.subprocess.Popen")
+    def test_query_flushes_pending_writes(self, mock_popen):
+        """batch() 内查询前先执行已缓冲的写命令，剩余命令在退出时执行"""
+        mock_popen.return_value = _batch_proc()
+        uci = UciExecutor()
+        with patch.object(UciExecutor, "_run_query", return_value="interface"):
+            with uci.batch():
+                uci.set("network.lan", "interface")
+                self.assertEqual(mock_popen.call_count, 0)
+                uci.query("get network.lan")
+                self.assertEqual(mock_popen.call_count, 1)
+                uci.commit("network")
+
+        self.assertEqual(mock_popen.call_count, 2)
+        first, last = (c.args[0] for c in mock_popen.return_value.communicate.call_args_list)
+        self.assertEqual(first, "set network.lan='interface'\n")
+        self.assertEqual(last, "commit network\n")
+
+    def test_query_reuses_single_shell(self):
+        """多次 query 应复用同一个常驻 sh 进程"""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            fake_uci = os.path.join(tmp, "uci")
+            with open(fake_uci, "w") as f:
+                f.write('#!/bin/sh\n'
+                        '[ "$2" = "network.wan.device" ] && echo eth0 && exit 0\n'
+                        'exit 1\n')
+            os.chmod(fake_uci, 0o755)
+
+            with patch.dict(os.environ, {"PATH": f"{tmp}:{os.environ['PATH']}"}):
+                uci = UciExecutor(dry_run=True)
+                self.assertEqual(uci.query("get network.wan.device"), "eth0")
+                pid = uci._shell.pid
+                self.assertIsNone(uci.query("get network.lan.device"))
+                self.assertEqual(uci.query("get network.wan.device"), "eth0")
+                self.assertEqual(uci._shell.pid, pid)
+                uci.close()
+                self.assertIsNone(uci._shell)
+
+    def test_context_manager_closes_shell(self):
+        """with 块退出时关闭常驻 sh 进程"""
+        with UciExecutor(dry_run=True) as uci:
+            shell = uci._ensure_shell()
+            self.assertIsNone(shell.poll())
+        self.assertIsNone(uci._shell)
+        self.assertIsNotNone(shell.poll())
+
+    def test_query_cached_until_write(self):
+        """相同查询只执行一次，写入同一配置包后缓存失效"""
+        uci = UciExecutor(dry_run=True)
+        with patch.object(UciExecutor, "_run_query", return_value="eth0") as mock_query:
+            uci.query("get network.wan.device")
+            uci.query("get network.wan.device")
+            self.assertEqual(mock_query.call_count, 1)
+
+            uci.set("dhcp.lan.start", "100")
+            uci.query("get network.wan.device")
+            self.assertEqual(mock_query.call_count, 1)
+
+            uci.set("network.wan.device", "eth1")
+            uci.query("get network.wan.device")
+            self.assertEqual(mock_query.call_count, 2)
+
+    def test_dump_parses_show_output(self):
+        """dump 应将 uci show 输出解析为 {路径: 值}，列表以空格连接"""
+        uci = UciExecutor(dry_run=True)
+        show = ("network.wan=interface\n"
+                "network.wan.device='eth0'\n"
+                "network.@device[0].ports='eth1' 'eth2'")
+        with patch.object(UciExecutor, "_run_query", return_value=show) as mock_query:
+            cfg = uci.dump("network")
+            self.assertIs(uci.dump("network"), cfg)
+
+        mock_query.assert_called_once_with("show network")
+        self.assertEqual(cfg, {
+            "network.wan": "interface",
+            "network.wan.device": "eth0",
+            "network.@device[0].ports": "eth1 eth2",
+        })
+
+    def test_subsystem_exists_checks_config_file_once(self):
+        """subsystem_exists 检查 /etc/config 且结果被缓存，不启动 uci 进程"""
+        UciExecutor.subsystem_exists.cache_clear()
+        try:
+            with patch("os.path.exists", return_value=False) as mock_exists:
+                self.assertFalse(UciExecutor.subsystem_exists("wireless"))
+                self.assertFalse(UciExecutor().subsystem_exists("wireless"))
+            mock_exists.assert_called_once_with("/etc/config/wireless")
+        finally:
+            UciExecutor.subsystem_exists.cache_clear()
+
 
 if __name__ == "__main__":
     unittest.main()
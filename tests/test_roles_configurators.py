@@ -1,12 +1,12 @@
 """
 roles.py + configurators.py 测试 — 角色注册表、DHCP/WiFi/防火墙配置器。
+
+各测试类之间没有共享的可变状态，pytest -n auto --dist=loadscope
+会把它们分发到不同 worker 并行执行。
 """
 
-import sys
-import os
 import unittest
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataclasses import replace
 
 from roles import (
     RoleRegistry,
@@ -17,18 +17,25 @@ from roles import (
 )
 from configurators import DhcpConfigurator, WiFiConfigurator, FirewallConfigurator
 from models import NetworkConfig, ProxyConfig, WifiConfig
-from uci import UciExecutor
-
+from tests.helpers import RecordingUci, assert_all_in
 
-class RecordingUci(UciExecutor):
-    """记录所有 UCI 命令"""
 
-    def __init__(self):
-        super().__init__(dry_run=True)
-        self.commands: list[str] = []
-
-    def run(self, command: str) -> None:
-        self.commands.append(f"uci {command}")
+# ================================================================
+# 共享网络配置 (NetworkConfig 为 frozen，可在用例间安全复用)
+# ================================================================
+_NET_LAN = NetworkConfig(
+    name="lan", vlan_id=1, role="proxy",
+    subnet="192.168.1.1", netmask="255.255.255.0",
+)
+_NET_HOME = NetworkConfig(
+    name="home", vlan_id=5, role="clean",
+    subnet="192.168.5.1", netmask="255.255.255.0",
+)
+_NET_IOT = NetworkConfig(
+    name="iot", vlan_id=3, role="isolate",
+    subnet="192.168.3.1", netmask="255.255.255.0",
+)
+_NET_LAN_WIFI = replace(_NET_LAN, wifi=WifiConfig(ssid="Test", password="12345678"))
 
 
 # ================================================================
@@ -40,23 +47,47 @@ class TestRoleRegistry(unittest.TestCase):
         registry = RoleRegistry()
         role = ProxyRole()
         registry.register("proxy", role)
-        self.assertIs(registry.get("proxy"), role)
+        assert registry.get("proxy") is role
 
     def test_get_unknown_raises(self):
         registry = RoleRegistry()
         with self.assertRaises(ValueError) as ctx:
             registry.get("nonexistent")
-        self.assertIn("nonexistent", str(ctx.exception))
+        assert "nonexistent" in str(ctx.exception)
+
+    def test_unknown_role_error_lists_registered_roles(self):
+        registry = create_default_registry()
+        registry.register("guest", CleanRole())
+        with self.assertRaises(ValueError) as ctx:
+            registry.get("nonexistent")
+        assert "[clean, guest, isolate, proxy]" in str(ctx.exception)
 
     def test_available_roles_sorted(self):
         registry = create_default_registry()
         roles = registry.available_roles
-        self.assertEqual(roles, ["clean", "isolate", "proxy"])
+        assert roles == ["clean", "isolate", "proxy"]
+
+    def test_available_roles_updated_on_register(self):
+        """预排序的角色列表在 register 后刷新"""
+        registry = RoleRegistry()
+        registry.register("proxy", ProxyRole())
+        assert registry.available_roles == ["proxy"]
+        registry.register("clean", CleanRole())
+        assert registry.available_roles == ["clean", "proxy"]
+
+    def test_default_registry_independent_copies(self):
+        """每次返回独立注册表 (角色实例共享)；register 不影响之后的调用方"""
+        registry = create_default_registry()
+        registry.register("guest", CleanRole())
+        fresh = create_default_registry()
+        assert fresh is not registry
+        assert fresh.get("proxy") is registry.get("proxy")
+        assert fresh.available_roles == ["clean", "isolate", "proxy"]
 
     def test_default_registry_has_3_roles(self):
         registry = create_default_registry()
         for name in ("proxy", "clean", "isolate"):
-            self.assertIsNotNone(registry.get(name))
+            assert registry.get(name) is not None
 
 
 # ================================================================
@@ -64,39 +95,35 @@ class TestRoleRegistry(unittest.TestCase):
 # ================================================================
 class TestProxyRole(unittest.TestCase):
 
-    def _make_net(self, name="lan"):
-        return NetworkConfig(
-            name=name, vlan_id=1, role="proxy",
-            subnet="192.168.1.1", netmask="255.255.255.0",
-        )
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.role = ProxyRole()
+        cls.main_proxy = ProxyConfig(side_router_ip="192.168.1.2", proxy_dhcp_mode="main")
+        cls.side_proxy = ProxyConfig(side_router_ip="192.168.1.2", proxy_dhcp_mode="side")
+
+    def setUp(self):
+        self.uci.reset()  # 类内共享一个记录器，每个用例前清空
 
     def test_proxy_main_mode_sets_gateway_dns(self):
         """Main 模式: 网关/DNS → 旁路由"""
-        uci = RecordingUci()
-        role = ProxyRole()
-        proxy = ProxyConfig(side_router_ip="192.168.1.2", proxy_dhcp_mode="main")
-        role.configure_dhcp(uci, self._make_net(), proxy)
+        self.role.configure_dhcp(self.uci, _NET_LAN, self.main_proxy)
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("3,192.168.1.2", cmds)  # Gateway
-        self.assertIn("6,192.168.1.2", cmds)  # DNS
+        cmds = self.uci.text
+        assert "3,192.168.1.2" in cmds  # Gateway
+        assert "6,192.168.1.2" in cmds  # DNS
 
     def test_proxy_side_mode_sets_ignore(self):
         """Side 模式: DHCP ignore"""
-        uci = RecordingUci()
-        role = ProxyRole()
-        proxy = ProxyConfig(side_router_ip="192.168.1.2", proxy_dhcp_mode="side")
-        role.configure_dhcp(uci, self._make_net(), proxy)
+        self.role.configure_dhcp(self.uci, _NET_LAN, self.side_proxy)
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("ignore", cmds)
+        cmds = self.uci.text
+        assert "ignore" in cmds
 
     def test_proxy_no_config_skips(self):
         """无 proxy 配置时不应崩溃"""
-        uci = RecordingUci()
-        role = ProxyRole()
-        role.configure_dhcp(uci, self._make_net(), None)
-        self.assertEqual(len(uci.commands), 0)
+        self.role.configure_dhcp(self.uci, _NET_LAN, None)
+        assert len(self.uci.commands) == 0
 
 
 # ================================================================
@@ -104,17 +131,19 @@ class TestProxyRole(unittest.TestCase):
 # ================================================================
 class TestCleanRole(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.role = CleanRole()
+
+    def setUp(self):
+        self.uci.reset()
+
     def test_clean_sets_public_dns(self):
-        uci = RecordingUci()
-        role = CleanRole()
-        net = NetworkConfig(
-            name="home", vlan_id=5, role="clean",
-            subnet="192.168.5.1", netmask="255.255.255.0",
-        )
-        role.configure_dhcp(uci, net, None)
+        self.role.configure_dhcp(self.uci, _NET_HOME, None)
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("223.5.5.5", cmds)
+        cmds = self.uci.text
+        assert "223.5.5.5" in cmds
 
 
 # ================================================================
@@ -122,17 +151,19 @@ class TestCleanRole(unittest.TestCase):
 # ================================================================
 class TestIsolateRole(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.role = IsolateRole()
+
+    def setUp(self):
+        self.uci.reset()
+
     def test_isolate_sets_public_dns(self):
-        uci = RecordingUci()
-        role = IsolateRole()
-        net = NetworkConfig(
-            name="iot", vlan_id=3, role="isolate",
-            subnet="192.168.3.1", netmask="255.255.255.0",
-        )
-        role.configure_dhcp(uci, net, None)
+        self.role.configure_dhcp(self.uci, _NET_IOT, None)
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("223.5.5.5", cmds)
+        cmds = self.uci.text
+        assert "223.5.5.5" in cmds
 
 
 # ================================================================
@@ -140,22 +171,24 @@ class TestIsolateRole(unittest.TestCase):
 # ================================================================
 class TestDhcpConfigurator(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.dhcp = DhcpConfigurator()
+        cls.role = CleanRole()
+
+    def setUp(self):
+        self.uci.reset()
+
     def test_basic_dhcp_setup(self):
         """应设置 start/limit/leasetime"""
-        uci = RecordingUci()
-        dhcp = DhcpConfigurator()
-        role = CleanRole()
-        net = NetworkConfig(
-            name="lan", vlan_id=1, role="clean",
-            subnet="192.168.1.1", netmask="255.255.255.0",
-        )
-        dhcp.configure(uci, net, None, role)
+        self.dhcp.configure(self.uci, replace(_NET_LAN, role="clean"), None, self.role)
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("dhcp.lan", cmds)
-        self.assertIn("start", cmds)
-        self.assertIn("limit", cmds)
-        self.assertIn("leasetime", cmds)
+        cmds = self.uci.text
+        assert "dhcp.lan" in cmds
+        assert "start" in cmds
+        assert "limit" in cmds
+        assert "leasetime" in cmds
 
 
 # ================================================================
@@ -163,63 +196,57 @@ class TestDhcpConfigurator(unittest.TestCase):
 # ================================================================
 class TestWiFiConfigurator(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.wifi_cfg = WiFiConfigurator()
+
+    def setUp(self):
+        self.uci.reset()
+
     def test_wifi_configured(self):
         """有 WiFi 配置时应生成 wifi-iface"""
-        uci = RecordingUci()
-        wifi_cfg = WiFiConfigurator()
-        net = NetworkConfig(
-            name="lan", vlan_id=1, role="proxy",
-            subnet="192.168.1.1", netmask="255.255.255.0",
-            wifi=WifiConfig(ssid="TestSSID", password="12345678"),
-        )
-        info = wifi_cfg.configure(uci, net)
-
-        self.assertIsNotNone(info)
-        self.assertEqual(info.ssid, "TestSSID")
-        self.assertEqual(info.password, "12345678")
-        cmds = " ".join(uci.commands)
-        self.assertIn("wifi-iface", cmds)
-        self.assertIn("TestSSID", cmds)
+        net = replace(_NET_LAN, wifi=WifiConfig(ssid="TestSSID", password="12345678"))
+        info = self.wifi_cfg.configure(self.uci, net)
+
+        assert info is not None
+        assert info.ssid == "TestSSID"
+        assert info.password == "12345678"
+        assert_all_in(self.uci.text, "wifi-iface", "TestSSID")
 
     def test_no_wifi_returns_none(self):
         """无 WiFi 配置时应返回 None"""
-        uci = RecordingUci()
-        wifi_cfg = WiFiConfigurator()
-        net = NetworkConfig(
-            name="iot", vlan_id=3, role="isolate",
-            subnet="192.168.3.1", netmask="255.255.255.0",
-        )
-        info = wifi_cfg.configure(uci, net)
-        self.assertIsNone(info)
+        info = self.wifi_cfg.configure(self.uci, _NET_IOT)
+        assert info is None
 
     def test_auto_generate_password(self):
         """auto_generate 应生成随机密码"""
-        uci = RecordingUci()
-        wifi_cfg = WiFiConfigurator()
-        net = NetworkConfig(
-            name="lan", vlan_id=1, role="proxy",
-            subnet="192.168.1.1", netmask="255.255.255.0",
-            wifi=WifiConfig(ssid="Test", password="auto_generate"),
-        )
-        info = wifi_cfg.configure(uci, net)
-
-        self.assertIsNotNone(info)
-        self.assertNotEqual(info.password, "auto_generate")
-        self.assertEqual(len(info.password), 8)
+        net = replace(_NET_LAN, wifi=WifiConfig(ssid="Test", password="auto_generate"))
+        info = self.wifi_cfg.configure(self.uci, net)
+
+        assert info is not None
+        assert info.password != "auto_generate"
+        assert len(info.password) == 8
+
+    def test_generated_password_alphanumeric(self):
+        """自动生成的密码只包含字母和数字"""
+        for length in (8, 16, 63):
+            password = WiFiConfigurator._generate_password(length)
+            assert len(password) == length
+            assert password.isalnum()
 
     def test_custom_radio(self):
         """指定 radio 参数"""
-        uci = RecordingUci()
-        wifi_cfg = WiFiConfigurator()
-        net = NetworkConfig(
-            name="lan", vlan_id=1, role="proxy",
-            subnet="192.168.1.1", netmask="255.255.255.0",
-            wifi=WifiConfig(ssid="Test", password="12345678"),
-        )
-        info = wifi_cfg.configure(uci, net, radio="radio1")
+        info = self.wifi_cfg.configure(self.uci, _NET_LAN_WIFI, radio="radio1")
+
+        assert "radio1" in self.uci.text
 
-        cmds = " ".join(uci.commands)
-        self.assertIn("radio1", cmds)
+    def test_wireless_unavailable_skips(self):
+        """无线子系统不可用时应跳过且不生成命令"""
+        info = self.wifi_cfg.configure(self.uci, _NET_LAN_WIFI, wireless_available=False)
+
+        assert info is None
+        assert len(self.uci.commands) == 0
 
 
 # ================================================================
@@ -227,21 +254,23 @@ class TestWiFiConfigurator(unittest.TestCase):
 # ================================================================
 class TestFirewallConfigurator(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.uci = RecordingUci()
+        cls.fw = FirewallConfigurator()
+        cls.role = CleanRole()
+
+    def setUp(self):
+        self.uci.reset()
+
     def test_firewall_zone_created(self):
         """应创建防火墙区域"""
-        uci = RecordingUci()
-        fw = FirewallConfigurator()
-        role = CleanRole()
-        net = NetworkConfig(
-            name="iot", vlan_id=3, role="isolate",
-            subnet="192.168.3.1", netmask="255.255.255.0",
-        )
-        fw.configure(uci, net, role)
-
-        cmds = " ".join(uci.commands)
-        self.assertIn("firewall.iot", cmds)
-        self.assertIn("REJECT", cmds)  # forward=REJECT
-        self.assertIn("forwarding", cmds)  # → WAN
+        zone_cfg = self.fw.configure(self.uci, _NET_IOT, self.role)
+
+        assert zone_cfg["firewall.iot"] == "zone"
+        assert zone_cfg["firewall.iot.forward"] == "REJECT"
+        assert "firewall.iot.forward='REJECT'" in self.uci.text
+        assert "forwarding" in self.uci.text  # → WAN
 
 
 if __name__ == "__main__":
@@ -5,7 +5,15 @@ UCI 命令执行器 — 封装 OpenWrt UCI 命令行操作。
 
 from __future__ import annotations
 
+import functools
+import os
+import shlex
 import subprocess
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+# 协处理器输出结束标记 (后接命令退出码)
+_END_MARKER = "__AUTO_VLAN_END__"
 
 
 class UciExecutor:
@@ -18,10 +26,20 @@ class UciExecutor:
     - 方便以后替换为 libuci 绑定或 REST API
     """
 
+    # __weakref__: hw_detect 以执行器为键做弱引用缓存
+    __slots__ = (
+        "_dry_run", "_export", "_commands", "_batch",
+        "_shell", "_query_cache", "_dump_cache", "__weakref__",
+    )
+
     def __init__(self, dry_run: bool = False, export: bool = False) -> None:
         self._dry_run = dry_run
         self._export = export
         self._commands: list[str] = []
+        self._batch: list[str] | None = None  # batch() 期间缓冲的命令
+        self._shell: subprocess.Popen | None = None  # 常驻查询进程 (惰性启动)
+        self._query_cache: dict[str, str | None] = {}  # 查询结果缓存
+        self._dump_cache: dict[str, dict[str, str]] = {}  # dump() 解析结果缓存
 
     # ----------------------------------------------------------
     # 底层执行
@@ -29,6 +47,7 @@ class UciExecutor:
     def run(self, command: str) -> None:
         """执行任意 uci 命令"""
         full_cmd = f"uci {command}"
+        self._invalidate(_config_of(command))
 
         # Export 模式：仅收集命令，不执行
         if self._export:
@@ -40,8 +59,58 @@ class UciExecutor:
             print(f"  [DRY-RUN] {full_cmd}")
             return
 
+        # 批处理模式：缓冲命令，退出 batch() 时一次性执行
+        if self._batch is not None:
+            self._batch.append(command)
+            return
+
         subprocess.run(full_cmd, shell=True, check=True)
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        批处理上下文：期间的所有写命令缓冲在内存中，
+        退出时通过一次 `uci batch` 子进程统一执行。
+
+        export / dry-run 模式本身不执行命令，直接透传。
+        上下文内抛出异常时丢弃尚未执行的缓冲命令。
+        注意: 期间调用 query() 会先 flush() 已缓冲的命令以读到最新值，
+        这部分写入不会随后续异常回滚 (仍处于未 commit 状态)。
+        """
+        if self._export or self._dry_run or self._batch is not None:
+            yield
+            return
+
+        self._batch = []
+        try:
+            yield
+            self.flush()
+        finally:
+            self._batch = None
+
+    def flush(self) -> None:
+        """立即通过一次 `uci batch` 执行已缓冲的写命令 (batch() 外无操作)"""
+        if not self._batch:
+            return
+        commands, self._batch = self._batch, []
+        self._run_batch(commands)
+        self._query_cache.clear()
+        self._dump_cache.clear()
+
+    @staticmethod
+    def _run_batch(commands: list[str]) -> None:
+        """将命令通过 stdin 管道交给单个 `uci batch` 进程执行"""
+        proc = subprocess.Popen(
+            ["uci", "batch"], stdin=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        _, err = proc.communicate("\n".join(commands) + "\n")
+        # uci batch 遇到错误命令只向 stderr 报错并继续执行，退出码仍可能为 0，
+        # 因此任何错误输出都视为失败
+        if proc.returncode != 0 or err.strip():
+            raise subprocess.CalledProcessError(
+                proc.returncode or 1, ["uci", "batch"], stderr=err,
+            )
+
     # ----------------------------------------------------------
     # 查询 API
     # ----------------------------------------------------------
@@ -51,20 +120,109 @@ class UciExecutor:
         if self._export:
             return None
 
+        # 先落盘缓冲的写命令，保证读到 batch() 内已写入的值
+        self.flush()
+
+        # 运行期间配置不会被外部修改，相同查询直接复用结果
+        if command not in self._query_cache:
+            self._query_cache[command] = self._run_query(command)
+        return self._query_cache[command]
+
+    def _run_query(self, command: str) -> str | None:
+        """实际执行查询"""
         # Dry-run 模式：尝试执行 (read-only)，如果失败则返回 None (Mac 环境)
+        # 所有查询复用同一个常驻 sh 进程，避免每次 fork/exec
         try:
-            result = subprocess.run(
-                f"uci {command}",
-                shell=True,
-                capture_output=True,
-                text=True,
-                check=True  # 确保命令成功才返回结果
+            shell = self._ensure_shell()
+            shell.stdin.write(
+                f"{{ uci {command}; }} </dev/null 2>/dev/null; "
+                f"printf '\\n{_END_MARKER} %s\\n' \"$?\"\n"
             )
-            return result.stdout.strip()
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # 命令执行失败 (例如命令不存在，或 uci 返回非0)
+            shell.stdin.flush()
+
+            lines = []
+            for line in iter(shell.stdout.readline, ""):
+                if line.startswith(_END_MARKER):
+                    status = int(line.split()[1])
+                    break
+                lines.append(line)
+            else:
+                # sh 意外退出
+                self.close()
+                return None
+        except (OSError, ValueError):
+            # 无法启动 sh 或管道已断开
+            self.close()
             return None
 
+        # 命令执行失败 (例如命令不存在，或 uci 返回非0)
+        if status != 0:
+            return None
+        return "".join(lines).strip()
+
+    def dump(self, config: str) -> dict[str, str]:
+        """
+        一次 `uci show <config>` 读取整个配置包，解析为 {路径: 值}。
+
+        路径与 `uci get` 的参数一致 (如 "network.wan.device"、
+        "network.@switch_vlan[0].ports")，列表值以空格连接，
+        与 `uci get` 的输出相同。查询失败或 export 模式返回空 dict。
+        """
+        if config not in self._dump_cache:
+            self._dump_cache[config] = _parse_show(self.query(f"show {config}") or "")
+        return self._dump_cache[config]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def subsystem_exists(name: str) -> bool:
+        """UCI 配置包是否存在 (检查 /etc/config/<name>，无需启动进程)"""
+        return os.path.exists(f"/etc/config/{name}")
+
+    def _invalidate(self, config: str) -> None:
+        """写操作后丢弃该配置包相关的查询缓存"""
+        self._query_cache = {
+            cmd: val for cmd, val in self._query_cache.items()
+            if _config_of(cmd) not in (config, "")
+        }
+        if config:
+            self._dump_cache.pop(config, None)
+        else:
+            self._dump_cache.clear()
+
+    def _ensure_shell(self) -> subprocess.Popen:
+        """按需启动常驻 sh 进程"""
+        if self._shell is None:
+            self._shell = subprocess.Popen(
+                ["/bin/sh"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        return self._shell
+
+    def close(self) -> None:
+        """关闭常驻查询进程"""
+        shell, self._shell = self._shell, None
+        if shell is None:
+            return
+        try:
+            shell.stdin.close()
+            shell.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            shell.kill()
+        shell.stdout.close()
+
+    def __enter__(self) -> UciExecutor:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if getattr(self, "_shell", None) is not None:
+            self.close()
+
     @property
     def is_dry_run(self) -> bool:
         return self._dry_run
@@ -124,6 +282,12 @@ class UciExecutor:
         """uci add_list <path>=<value>"""
         self.run(f"add_list {path}='{value}'")
 
+    def extend_list(self, path: str, values: Iterable[str]) -> None:
+        """对每个值执行 uci add_list <path>=<value>，合并为一次 uci batch"""
+        with self.batch():
+            for value in values:
+                self.add_list(path, value)
+
     def delete(self, path: str) -> None:
         """uci delete <path>"""
         self.run(f"delete {path}")
@@ -131,3 +295,32 @@ class UciExecutor:
     def commit(self, config: str) -> None:
         """uci commit <config>"""
         self.run(f"commit {config}")
+
+
+def _config_of(command: str) -> str:
+    """提取 uci 命令操作的配置包名: 'get network.wan.device' -> 'network'"""
+    parts = command.split(None, 2)
+    if len(parts) < 2:
+        return ""
+    return parts[1].partition(".")[0]
+
+
+def _parse_show(text: str) -> dict[str, str]:
+    """
+    解析 `uci show` 输出:
+        network.wan=interface
+        network.wan.device='eth0'
+        network.@device[0].ports='eth1' 'eth2'
+    """
+    result: dict[str, str] = {}
+    for line in text.splitlines():
+        key, sep, raw = line.partition("=")
+        if not sep:
+            continue
+        try:
+            value = " ".join(shlex.split(raw))
+        except ValueError:
+            # 引号不匹配，按原样去掉外层引号
+            value = raw.strip("'")
+        result[key] = value
+    return result